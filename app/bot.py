@@ -156,6 +156,10 @@ class HotSharkBot:
                 is_live=is_live
             )
             
+            # A manual recommendation resets the pair's schedule in the monitor
+            if self.market_monitor:
+                self.market_monitor.notify_recommendation_tick()
+            
             await update.message.reply_text("✅ تم إرسال التوصية لجميع المشتركين!")
             
         except Exception as e:
@@ -199,6 +203,10 @@ class HotSharkBot:
                 is_critical=is_critical
             )
             
+            # Let the monitor schedule the pre-release alert
+            if self.market_monitor:
+                self.market_monitor.notify_news_added()
+            
             # Send to all subscribed users
             db = SessionLocal()
             try:
@@ -44,6 +44,9 @@ class Config:
     POLYGON_API_KEY: str = os.getenv("POLYGON_API_KEY", "")
     OANDA_API_KEY: str = os.getenv("OANDA_API_KEY", "")
 
+    # Redis cache for market data API responses (optional, e.g. redis://localhost:6379/0)
+    REDIS_URL = os.getenv("REDIS_URL", None)
+
     # Exness Configuration (Optional - Advanced Users Only)
     EXNESS_LOGIN = os.getenv("EXNESS_LOGIN", None)
     EXNESS_PASSWORD = os.getenv("EXNESS_PASSWORD", None)
@@ -33,9 +33,10 @@ def create_tables():
     Create all tables in the database
     """
     Base.metadata.create_all(bind=engine)
+    ensure_market_data_schema(engine)
 
 
 
-from app.models.market_data import MarketData, IndicatorData, Signal
+from app.models.market_data import MarketData, IndicatorData, Signal, ensure_market_data_schema
 
 
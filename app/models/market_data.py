@@ -3,7 +3,7 @@ Market data model for HOT SHARK Bot.
 Stores historical and real-time market data for analysis.
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, insert, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
@@ -23,9 +23,55 @@ class MarketData(Base):
     interval = Column(String, nullable=False) # e.g., 1m, 5m, 1h, 1d
     source = Column(String, nullable=False) # e.g., TwelveData, Polygon.io
 
+    # One bar per symbol/interval/timestamp; also the conflict target for bulk inserts.
+    # source is deliberately not part of the key: readers expect a single series per
+    # symbol/interval, so the first source to store a bar wins and later sources skip it
+    __table_args__ = (
+        Index('uq_market_data_bar', 'symbol', 'interval', 'timestamp', unique=True),
+    )
+
     def __repr__(self):
         return f"<MarketData(symbol='{self.symbol}', timestamp='{self.timestamp}', close_price={self.close_price})>"
 
+def ensure_market_data_schema(engine):
+    """Create the market data tables and the unique bar index on an existing table.
+    create_all skips tables that already exist, so a market_data table created before
+    uq_market_data_bar has its duplicate bars removed (lowest id kept) and the index
+    added here; PostgreSQL ON CONFLICT fails without it.
+    """
+    Base.metadata.create_all(bind=engine)
+    indexes = {ix['name'] for ix in inspect(engine).get_indexes(MarketData.__tablename__)}
+    if 'uq_market_data_bar' in indexes:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "DELETE FROM market_data WHERE id NOT IN "
+            "(SELECT MIN(id) FROM market_data GROUP BY symbol, interval, timestamp)"
+        ))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_market_data_bar "
+            "ON market_data (symbol, interval, timestamp)"
+        ))
+
+def insert_market_data(db, records):
+    """Bulk insert MarketData mappings in one statement, skipping bars that already exist.
+    Uses ON CONFLICT DO NOTHING on PostgreSQL and SQLite; other dialects get a plain insert.
+    """
+    if not records:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(insert(MarketData.__table__), records)
+        return
+    stmt = dialect_insert(MarketData.__table__).on_conflict_do_nothing(
+        index_elements=['symbol', 'interval', 'timestamp']
+    )
+    db.execute(stmt, records)
+
 class IndicatorData(Base):
     __tablename__ = 'indicator_data'
 
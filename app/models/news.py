@@ -10,7 +10,7 @@ class News(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(Text, nullable=False)
-    time = Column(DateTime, nullable=False)
+    time = Column(DateTime, nullable=False, index=True)
     currency = Column(String(10), nullable=True)
     impact = Column(String(20), nullable=True)  # low, medium, high
     description = Column(Text, nullable=True)
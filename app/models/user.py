@@ -1,13 +1,17 @@
 """
 User model for HOT SHARK Bot
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Active-subscriber lookups filter on both columns
+        Index("ix_users_subscription", "is_subscribed", "subscription_expiry"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)  # Telegram User ID
     username = Column(String(255), nullable=True)
@@ -0,0 +1,104 @@
+"""
+Numba kernels for DataProcessorService technical indicators.
+All indicators are computed in a single pass over the close-price array.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def compute_all(close):
+    """Compute SMA 10/20, RSI 14, MACD 12/26/9 and Bollinger mid/std for a close-price array.
+
+    Matches the pandas definitions previously used: rolling windows are NaN until full,
+    EMAs are seeded with the first value (adjust=False) and the Bollinger std uses ddof=1.
+    Window statistics are updated incrementally (add the new bar, drop the oldest), so each
+    costs O(1) per bar regardless of window length. The Bollinger variance uses Welford's
+    update rather than E[x^2] - E[x]^2, which cancels badly on high-priced symbols.
+    Accumulators run in float64; outputs are stored as float32 since they only feed ML features.
+    Returns (sma10, sma20, rsi14, macd, signal, hist, bb_mid, bb_std).
+    """
+    n = close.shape[0]
+    sma10 = np.full(n, np.nan, dtype=np.float32)
+    sma20 = np.full(n, np.nan, dtype=np.float32)
+    rsi14 = np.full(n, np.nan, dtype=np.float32)
+    macd = np.empty(n, dtype=np.float32)
+    signal = np.empty(n, dtype=np.float32)
+    hist = np.empty(n, dtype=np.float32)
+    bb_std = np.full(n, np.nan, dtype=np.float32)
+
+    if n == 0:
+        return sma10, sma20, rsi14, macd, signal, hist, sma20.copy(), bb_std
+
+    alpha12 = 2.0 / 13.0
+    alpha26 = 2.0 / 27.0
+    alpha9 = 2.0 / 10.0
+    ema12 = close[0]
+    ema26 = close[0]
+    sig = 0.0
+
+    sum10 = 0.0
+    mean20 = 0.0
+    m2_20 = 0.0  # Welford sum of squared deviations over the 20-bar window
+    gain_sum = 0.0
+    loss_sum = 0.0
+
+    for i in range(n):
+        x = close[i]
+
+        # SMA 10 (running sum)
+        sum10 += x
+        if i >= 10:
+            sum10 -= close[i - 10]
+        if i >= 9:
+            sma10[i] = sum10 / 10.0
+
+        # SMA 20 / Bollinger (sliding-window Welford)
+        if i < 20:
+            d = x - mean20
+            mean20 += d / (i + 1)
+            m2_20 += d * (x - mean20)
+        else:
+            old = close[i - 20]
+            d = x - old
+            new_mean = mean20 + d / 20.0
+            m2_20 += d * (x - new_mean + old - mean20)
+            mean20 = new_mean
+        if i >= 19:
+            sma20[i] = mean20
+            bb_std[i] = np.sqrt(max(m2_20, 0.0) / 19.0)
+
+        # RSI 14 (the first bar has no delta and counts as zero gain/loss)
+        if i > 0:
+            d = x - close[i - 1]
+            if d > 0:
+                gain_sum += d
+            elif d < 0:
+                loss_sum -= d
+        if i >= 14 and i - 14 > 0:
+            d = close[i - 14] - close[i - 15]
+            if d > 0:
+                gain_sum -= d
+            elif d < 0:
+                loss_sum += d
+        if i >= 13:
+            if loss_sum > 0.0:
+                rsi14[i] = 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+            elif gain_sum > 0.0:
+                rsi14[i] = 100.0
+
+        # MACD 12/26 with 9-period signal line
+        if i > 0:
+            ema12 = alpha12 * x + (1.0 - alpha12) * ema12
+            ema26 = alpha26 * x + (1.0 - alpha26) * ema26
+        m = ema12 - ema26
+        if i == 0:
+            sig = m
+        else:
+            sig = alpha9 * m + (1.0 - alpha9) * sig
+        macd[i] = m
+        signal[i] = sig
+        hist[i] = m - sig
+
+    return sma10, sma20, rsi14, macd, signal, hist, sma20.copy(), bb_std
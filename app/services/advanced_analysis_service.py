@@ -3,6 +3,9 @@ Advanced Analysis Service for HOT SHARK Bot.
 Implements CVD, VWAP, Volume Dots, and Stop Run analysis.
 """
 
+import asyncio
+import time
+import weakref
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -16,6 +19,48 @@ from app.services.multi_source_data_service import MultiSourceDataService
 
 logger = logging.getLogger(__name__)
 
+# Columns kept from raw OHLCV bars; prices/volume are held as float32
+_OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+_OHLCV_FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Timeframe -> pandas resample frequency / bar length in seconds
+_TIMEFRAME_FREQ = {
+    'M1': '1min', 'M5': '5min', 'M15': '15min',
+    'M30': '30min', 'H1': '1h', 'H4': '4h', 'D1': '1D'
+}
+_TIMEFRAME_SECONDS = {
+    'M1': 60, 'M5': 300, 'M15': 900,
+    'M30': 1800, 'H1': 3600, 'H4': 14400, 'D1': 86400
+}
+
+# Sentiment score thresholds; a score equal to a bin edge falls in the lower bucket
+_SENTIMENT_BINS = np.array([-50, -25, 25, 50])
+_SENTIMENT_LABELS = ('strongly_bearish', 'bearish', 'neutral', 'bullish', 'strongly_bullish')
+
+# JIT-compiled rolling reducers (pandas numba engine)
+_NUMBA_ROLLING_KWARGS = {'nopython': True, 'nogil': True, 'parallel': True}
+_numba_rolling_warmed = False
+
+def _warm_up_numba_rolling():
+    """Compile the numba rolling max/min kernels once so real calls skip the JIT cost"""
+    global _numba_rolling_warmed
+    if _numba_rolling_warmed:
+        return
+    try:
+        dummy = pd.Series(np.zeros(16, dtype=np.float32))
+        dummy.rolling(window=5, center=True).max(engine='numba', engine_kwargs=_NUMBA_ROLLING_KWARGS)
+        dummy.rolling(window=5, center=True).min(engine='numba', engine_kwargs=_NUMBA_ROLLING_KWARGS)
+        _numba_rolling_warmed = True
+    except Exception as e:
+        logger.warning(f"Numba rolling warm-up failed: {e}")
+
+def _ohlcv_frame(ohlcv_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Build a compact, time-sorted OHLCV DataFrame from raw bars"""
+    df = pd.DataFrame(ohlcv_data, columns=_OHLCV_COLUMNS)
+    df[_OHLCV_FLOAT_COLUMNS] = df[_OHLCV_FLOAT_COLUMNS].astype(np.float32)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.sort_values('timestamp')
+
 @dataclass
 class CVDSignal:
     """Cumulative Volume Delta signal"""
@@ -59,6 +104,12 @@ class AdvancedAnalysisService:
     def __init__(self, db: Session):
         self.db = db
         self.data_service = MultiSourceDataService(db)
+        _warm_up_numba_rolling()
+        
+        # (symbol, timeframe, periods) -> (monotonic time stored, analysis)
+        self._analysis_cache: Dict[Tuple[str, str, int], Tuple[float, Dict[str, Any]]] = {}
+        # Per-key locks so concurrent cache misses share a single computation
+        self._analysis_locks = weakref.WeakValueDictionary()
         
     async def calculate_cvd(self, symbol: str, timeframe: str = "M1", periods: int = 100) -> List[CVDSignal]:
         """Calculate Cumulative Volume Delta"""
@@ -70,51 +121,46 @@ class AdvancedAnalysisService:
                 logger.warning(f"No tick data for CVD calculation: {symbol}")
                 return []
             
-            # Convert to DataFrame
-            df = pd.DataFrame(tick_data)
+            # Convert to DataFrame, keeping only the tick fields used below
+            df = pd.DataFrame(tick_data, columns=['timestamp', 'bid', 'ask', 'volume'])
+            for col in ('bid', 'ask', 'volume'):
+                df[col] = df[col].astype(np.float32)
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             df = df.sort_values('timestamp')
             
             # Calculate volume delta for each tick
             df['mid_price'] = (df['bid'] + df['ask']) / 2
             df['price_change'] = df['mid_price'].diff()
+            df.drop(columns=['bid', 'ask'], inplace=True)
             
-            # Estimate buy/sell volume based on price movement and tick direction
-            df['volume_delta'] = np.where(
-                df['price_change'] > 0, 
-                df['volume'],  # Buying pressure
-                np.where(
-                    df['price_change'] < 0,
-                    -df['volume'],  # Selling pressure
-                    0  # No change
-                )
-            )
+            # Estimate buy/sell volume based on price movement and tick direction:
+            # +volume on upticks, -volume on downticks, 0 when unchanged
+            price_direction = np.nan_to_num(np.sign(df['price_change'].to_numpy()))
+            volume_delta = price_direction * df['volume'].to_numpy()
+            df['volume_delta'] = volume_delta
             
-            # Calculate cumulative volume delta
-            df['cvd'] = df['volume_delta'].cumsum()
+            # Calculate cumulative volume delta (accumulated in float64 to avoid float32 drift)
+            df['cvd'] = np.cumsum(volume_delta, dtype=np.float64)
             
             # Resample to desired timeframe
             df.set_index('timestamp', inplace=True)
             
-            timeframe_map = {
-                'M1': '1T', 'M5': '5T', 'M15': '15T', 
-                'M30': '30T', 'H1': '1H', 'H4': '4H', 'D1': '1D'
-            }
-            
-            resampled = df.resample(timeframe_map.get(timeframe, '1T')).agg({
+            resampled = df.resample(_TIMEFRAME_FREQ.get(timeframe, '1min')).agg({
                 'cvd': 'last',
                 'mid_price': 'last',
                 'volume': 'sum'
             }).dropna()
             
+            # Signals compare consecutive bars; nothing to do for sparse/closed markets
+            if len(resampled) < 2:
+                return []
+            
             # Generate CVD signals
+            max_cvd_change = resampled['cvd'].diff().abs().max()
+            rows = list(resampled[['cvd', 'mid_price']].itertuples(name=None))
+            
             signals = []
-            for i in range(1, len(resampled)):
-                current_cvd = resampled.iloc[i]['cvd']
-                prev_cvd = resampled.iloc[i-1]['cvd']
-                current_price = resampled.iloc[i]['mid_price']
-                prev_price = resampled.iloc[i-1]['mid_price']
-                
+            for (_, prev_cvd, prev_price), (timestamp, current_cvd, current_price) in zip(rows, rows[1:]):
                 # Determine trend
                 cvd_trend = 'bullish' if current_cvd > prev_cvd else 'bearish' if current_cvd < prev_cvd else 'neutral'
                 
@@ -127,15 +173,14 @@ class AdvancedAnalysisService:
                 
                 # Calculate strength (0-100)
                 cvd_change = abs(current_cvd - prev_cvd)
-                max_cvd_change = resampled['cvd'].diff().abs().max()
                 strength = min(100, (cvd_change / max_cvd_change * 100)) if max_cvd_change > 0 else 0
                 
                 signal = CVDSignal(
-                    timestamp=resampled.index[i],
-                    cvd_value=current_cvd,
+                    timestamp=timestamp,
+                    cvd_value=float(current_cvd),
                     trend=cvd_trend,
                     divergence=divergence,
-                    strength=strength
+                    strength=float(strength)
                 )
                 signals.append(signal)
             
@@ -157,24 +202,22 @@ class AdvancedAnalysisService:
                 return []
             
             # Convert to DataFrame
-            df = pd.DataFrame(ohlcv_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
+            df = _ohlcv_frame(ohlcv_data)
             
             # Calculate typical price
             df['typical_price'] = (df['high'] + df['low'] + df['close']) / 3
             
-            # Calculate VWAP
-            df['price_volume'] = df['typical_price'] * df['volume']
-            df['cumulative_pv'] = df['price_volume'].cumsum()
-            df['cumulative_volume'] = df['volume'].cumsum()
-            df['vwap'] = df['cumulative_pv'] / df['cumulative_volume']
+            # Calculate VWAP (running sums in float64 to avoid float32 drift)
+            volume64 = df['volume'].astype(np.float64)
+            cumulative_pv = (df['typical_price'].astype(np.float64) * volume64).cumsum()
+            cumulative_volume = volume64.cumsum()
+            df['vwap'] = (cumulative_pv / cumulative_volume).astype(np.float32)
             
             # Generate VWAP signals
             signals = []
-            for i, row in df.iterrows():
-                current_price = row['close']
-                vwap_value = row['vwap']
+            for row in df.itertuples(index=False):
+                current_price = row.close
+                vwap_value = row.vwap
                 
                 # Determine price position relative to VWAP
                 if current_price > vwap_value * 1.001:  # 0.1% threshold
@@ -191,11 +234,11 @@ class AdvancedAnalysisService:
                 distance_percentage = ((current_price - vwap_value) / vwap_value) * 100
                 
                 signal = VWAPSignal(
-                    timestamp=row['timestamp'],
-                    vwap_value=vwap_value,
+                    timestamp=row.timestamp,
+                    vwap_value=float(vwap_value),
                     price_position=position,
                     trend=trend,
-                    distance_percentage=distance_percentage
+                    distance_percentage=float(distance_percentage)
                 )
                 signals.append(signal)
             
@@ -217,9 +260,7 @@ class AdvancedAnalysisService:
                 return []
             
             # Convert to DataFrame
-            df = pd.DataFrame(ohlcv_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
+            df = _ohlcv_frame(ohlcv_data)
             
             # Calculate volume statistics
             volume_mean = df['volume'].mean()
@@ -229,8 +270,8 @@ class AdvancedAnalysisService:
             
             # Identify significant volume levels
             signals = []
-            for i, row in df.iterrows():
-                volume = row['volume']
+            for row in df.itertuples(index=False):
+                volume = row.volume
                 
                 if volume >= volume_threshold_high:
                     significance = 'high'
@@ -242,8 +283,8 @@ class AdvancedAnalysisService:
                     continue  # Skip low volume periods
                 
                 # Determine type based on price action
-                price_range = row['high'] - row['low']
-                close_position = (row['close'] - row['low']) / price_range if price_range > 0 else 0.5
+                price_range = row.high - row.low
+                close_position = (row.close - row.low) / price_range if price_range > 0 else 0.5
                 
                 if close_position > 0.7:
                     volume_type = 'accumulation'
@@ -253,12 +294,12 @@ class AdvancedAnalysisService:
                     volume_type = 'neutral'
                 
                 # Use typical price as the significant level
-                price_level = (row['high'] + row['low'] + row['close']) / 3
+                price_level = (row.high + row.low + row.close) / 3
                 
                 signal = VolumeDotsSignal(
-                    timestamp=row['timestamp'],
-                    price_level=price_level,
-                    volume_intensity=intensity,
+                    timestamp=row.timestamp,
+                    price_level=float(price_level),
+                    volume_intensity=float(intensity),
                     significance=significance,
                     type=volume_type
                 )
@@ -282,71 +323,79 @@ class AdvancedAnalysisService:
                 return []
             
             # Convert to DataFrame
-            df = pd.DataFrame(ohlcv_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
+            df = _ohlcv_frame(ohlcv_data)
             
             # Calculate swing highs and lows
             window = 5  # Look for swings in 5-period windows
-            df['swing_high'] = df['high'].rolling(window=window, center=True).max() == df['high']
-            df['swing_low'] = df['low'].rolling(window=window, center=True).min() == df['low']
-            
-            # Identify potential stop run levels
-            swing_highs = df[df['swing_high']]['high'].tolist()
-            swing_lows = df[df['swing_low']]['low'].tolist()
+            df['swing_high'] = df['high'].rolling(window=window, center=True).max(
+                engine='numba', engine_kwargs=_NUMBA_ROLLING_KWARGS
+            ) == df['high']
+            df['swing_low'] = df['low'].rolling(window=window, center=True).min(
+                engine='numba', engine_kwargs=_NUMBA_ROLLING_KWARGS
+            ) == df['low']
+            
+            # Identify potential stop run levels (sorted for binary search)
+            swing_highs = np.sort(df.loc[df['swing_high'], 'high'].to_numpy())
+            swing_lows = np.sort(df.loc[df['swing_low'], 'low'].to_numpy())
+            
+            highs = df['high'].to_numpy()
+            lows = df['low'].to_numpy()
+            closes = df['close'].to_numpy()
+            volumes = df['volume'].to_numpy()
+            timestamps = df['timestamp'].tolist()
             
             signals = []
             
             # Check for stop runs above swing highs
             for i in range(window, len(df)):
-                current_high = df.iloc[i]['high']
-                current_low = df.iloc[i]['low']
-                current_close = df.iloc[i]['close']
-                current_volume = df.iloc[i]['volume']
-                timestamp = df.iloc[i]['timestamp']
+                current_high = highs[i]
+                current_low = lows[i]
+                current_close = closes[i]
+                current_volume = volumes[i]
+                timestamp = timestamps[i]
                 
-                # Check for upward stop run (above recent swing high)
-                recent_swing_highs = [h for h in swing_highs if h < current_high]
-                if recent_swing_highs:
-                    nearest_high = max(recent_swing_highs)
+                # Check for upward stop run (above nearest swing high below the bar's high)
+                idx = np.searchsorted(swing_highs, current_high, side='left') - 1
+                if idx >= 0:
+                    nearest_high = swing_highs[idx]
                     if current_high > nearest_high and current_close < nearest_high:
                         # Potential stop run detected
                         liquidity_grabbed = current_volume
                         probability = min(100, (current_high - nearest_high) / nearest_high * 1000)
                         
                         # Calculate next potential target
-                        higher_levels = [h for h in swing_highs if h > current_high]
-                        next_target = min(higher_levels) if higher_levels else None
+                        above = np.searchsorted(swing_highs, current_high, side='right')
+                        next_target = float(swing_highs[above]) if above < len(swing_highs) else None
                         
                         signal = StopRunSignal(
                             timestamp=timestamp,
-                            price_level=current_high,
+                            price_level=float(current_high),
                             direction='upward',
-                            liquidity_grabbed=liquidity_grabbed,
-                            probability=probability,
+                            liquidity_grabbed=float(liquidity_grabbed),
+                            probability=float(probability),
                             next_target=next_target
                         )
                         signals.append(signal)
                 
-                # Check for downward stop run (below recent swing low)
-                recent_swing_lows = [l for l in swing_lows if l > current_low]
-                if recent_swing_lows:
-                    nearest_low = min(recent_swing_lows)
+                # Check for downward stop run (below nearest swing low above the bar's low)
+                idx = np.searchsorted(swing_lows, current_low, side='right')
+                if idx < len(swing_lows):
+                    nearest_low = swing_lows[idx]
                     if current_low < nearest_low and current_close > nearest_low:
                         # Potential stop run detected
                         liquidity_grabbed = current_volume
                         probability = min(100, (nearest_low - current_low) / nearest_low * 1000)
                         
                         # Calculate next potential target
-                        lower_levels = [l for l in swing_lows if l < current_low]
-                        next_target = max(lower_levels) if lower_levels else None
+                        below = np.searchsorted(swing_lows, current_low, side='left') - 1
+                        next_target = float(swing_lows[below]) if below >= 0 else None
                         
                         signal = StopRunSignal(
                             timestamp=timestamp,
-                            price_level=current_low,
+                            price_level=float(current_low),
                             direction='downward',
-                            liquidity_grabbed=liquidity_grabbed,
-                            probability=probability,
+                            liquidity_grabbed=float(liquidity_grabbed),
+                            probability=float(probability),
                             next_target=next_target
                         )
                         signals.append(signal)
@@ -359,6 +408,35 @@ class AdvancedAnalysisService:
             return []
     
     async def get_comprehensive_analysis(self, symbol: str, timeframe: str = "M1", periods: int = 100) -> Dict[str, Any]:
+        """Get comprehensive analysis, reusing results for a quarter of a bar.
+        Each caller gets its own shallow copy of the cached dict; the nested
+        sections are shared with the cache and must be treated as read-only.
+        """
+        key = (symbol, timeframe, periods)
+        ttl = _TIMEFRAME_SECONDS.get(timeframe, 60) / 4
+        
+        cached = self._analysis_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return dict(cached[1])
+        
+        lock = self._analysis_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._analysis_locks[key] = lock
+        
+        async with lock:
+            # Another caller may have refreshed the entry while we waited
+            cached = self._analysis_cache.get(key)
+            if cached and time.monotonic() - cached[0] < ttl:
+                return dict(cached[1])
+            
+            analysis = await self._compute_comprehensive_analysis(symbol, timeframe, periods)
+            if 'error' not in analysis:
+                self._analysis_cache[key] = (time.monotonic(), analysis)
+                return dict(analysis)
+            return analysis
+    
+    async def _compute_comprehensive_analysis(self, symbol: str, timeframe: str, periods: int) -> Dict[str, Any]:
         """Get comprehensive analysis combining all indicators"""
         try:
             # Run all analyses in parallel
@@ -380,7 +458,7 @@ class AdvancedAnalysisService:
                     'signals': cvd_signals,
                     'latest_trend': cvd_signals[-1].trend if cvd_signals else 'neutral',
                     'divergence_detected': any(s.divergence for s in cvd_signals[-5:]) if cvd_signals else False,
-                    'average_strength': np.mean([s.strength for s in cvd_signals[-10:]]) if cvd_signals else 0
+                    'average_strength': float(np.mean([s.strength for s in cvd_signals[-10:]])) if cvd_signals else 0
                 },
                 'vwap_analysis': {
                     'signals': vwap_signals,
@@ -451,16 +529,7 @@ class AdvancedAnalysisService:
                     sentiment_factors.append(f"Downward liquidity grabs")
             
             # Determine overall sentiment
-            if sentiment_score > 50:
-                overall_sentiment = 'strongly_bullish'
-            elif sentiment_score > 25:
-                overall_sentiment = 'bullish'
-            elif sentiment_score > -25:
-                overall_sentiment = 'neutral'
-            elif sentiment_score > -50:
-                overall_sentiment = 'bearish'
-            else:
-                overall_sentiment = 'strongly_bearish'
+            overall_sentiment = _SENTIMENT_LABELS[int(np.digitize(sentiment_score, _SENTIMENT_BINS, right=True))]
             
             analysis['overall_sentiment'] = {
                 'sentiment': overall_sentiment,
@@ -3,7 +3,11 @@ Alpha Vantage Data Service for HOT SHARK Bot
 Safe alternative to Exness for price data
 """
 
-import requests
+import asyncio
+import aiohttp
+import hashlib
+import json
+import redis.asyncio as redis
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -17,18 +21,96 @@ from app.models.market_data import MarketData
 
 logger = logging.getLogger(__name__)
 
+# Alpha Vantage time series field names -> OHLCV column names
+_AV_COLUMNS = {
+    '1. open': 'open',
+    '2. high': 'high',
+    '3. low': 'low',
+    '4. close': 'close',
+    '5. volume': 'volume'
+}
+
+# Response cache lifetimes (seconds), tuned to how quickly each series goes stale
+_CACHE_TTL_BY_FUNCTION = {
+    'CURRENCY_EXCHANGE_RATE': 30,
+    'FX_DAILY': 86400
+}
+_CACHE_TTL_BY_INTERVAL = {
+    '1min': 60,
+    '5min': 300,
+    '15min': 900,
+    '30min': 1800,
+    '60min': 3600
+}
+
+def _cache_ttl(params: Dict) -> int:
+    """Get the cache lifetime for a request"""
+    ttl = _CACHE_TTL_BY_FUNCTION.get(params.get('function'))
+    if ttl is None:
+        ttl = _CACHE_TTL_BY_INTERVAL.get(params.get('interval'), 60)
+    return ttl
+
+def _parse_time_series(time_series: Dict, volume: Optional[float] = None) -> pd.DataFrame:
+    """
+    Convert an Alpha Vantage time series dict into a chronological OHLCV DataFrame
+    
+    Args:
+        time_series: Mapping of timestamp -> field values as returned by the API
+        volume: Constant volume to use when the series has none (forex)
+    """
+    df = pd.DataFrame.from_dict(time_series, orient='index', dtype='float64').rename(columns=_AV_COLUMNS)
+    # Forex and crypto series are reported in UTC
+    df.index = pd.to_datetime(df.index, utc=True)
+    
+    if volume is not None:
+        df = df[['open', 'high', 'low', 'close']].assign(volume=volume)
+    else:
+        df = df[['open', 'high', 'low', 'close', 'volume']]
+    
+    # Alpha Vantage lists newest first, so a reversal usually replaces the sort
+    if df.index.is_monotonic_decreasing:
+        df = df.iloc[::-1]
+    elif not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    
+    return df.reset_index().rename(columns={'index': 'timestamp'})
+
+def _with_dtype(df: pd.DataFrame, dtype: str) -> pd.DataFrame:
+    """
+    Cast the OHLCV columns of a parsed series for the caller
+    
+    Parsing keeps float64 so quotes with more than 7 significant digits survive;
+    float32 halves memory and bandwidth for downstream indicator passes but must
+    not be what gets persisted.
+    """
+    if dtype == 'float64':
+        return df
+    return df.astype({col: dtype for col in _AV_COLUMNS.values()})
+
 class AlphaVantageService:
     """
     Alpha Vantage data service - safe alternative to Exness
     Free tier: 25 API calls per day
     """
     
+    # Pooled HTTP session shared by every instance, so TLS connections are reused
+    _session: Optional[aiohttp.ClientSession] = None
+    
+    # Token bucket shared by every instance, since the quota is per API key (free tier: 5 calls per minute)
+    _bucket_size = float(getattr(Config, 'API_RATE_LIMIT_PER_MINUTE', 5))
+    _refill_rate = _bucket_size / 60.0  # tokens per second
+    _tokens = _bucket_size
+    _last_refill = time.monotonic()
+    _rate_lock: Optional[asyncio.Lock] = None
+    
     def __init__(self, db: Session):
         self.db = db
         self.api_key = getattr(Config, 'ALPHA_VANTAGE_API_KEY', 'demo')
         self.base_url = "https://www.alphavantage.co/query"
-        self.rate_limit_delay = 12  # 5 calls per minute = 12 seconds between calls
-        self.last_call_time = 0
+        
+        # Optional Redis cache for raw API responses
+        redis_url = getattr(Config, 'REDIS_URL', None)
+        self.redis = redis.Redis.from_url(redis_url) if redis_url else None
         
         # Symbol mapping for Alpha Vantage
         self.symbol_mapping = {
@@ -41,59 +123,116 @@ class AlphaVantageService:
             'ETHUSD': 'ETH/USD'
         }
         
-    def _rate_limit(self):
-        """Enforce rate limiting"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_call_time
+        # Precomputed (from, to) currency pairs and symbol list
+        self._av_pair = {k: tuple(v.split('/')) for k, v in self.symbol_mapping.items()}
+        self._supported_symbols = list(self.symbol_mapping.keys())
         
-        if time_since_last_call < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last_call
-            logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-            
-        self.last_call_time = time.time()
+    @classmethod
+    async def _get_session(cls) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if cls._session is None or cls._session.closed:
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300, keepalive_timeout=60)
+            )
+        return cls._session
+    
+    @classmethod
+    async def close(cls):
+        """Close the shared HTTP session"""
+        if cls._session and not cls._session.closed:
+            await cls._session.close()
+    
+    @classmethod
+    async def _rate_limit(cls):
+        """Take a token from the shared rate-limit bucket, waiting for a refill if it is empty"""
+        if cls._rate_lock is None:
+            cls._rate_lock = asyncio.Lock()
+        
+        async with cls._rate_lock:
+            now = time.monotonic()
+            cls._tokens = min(cls._bucket_size, cls._tokens + (now - cls._last_refill) * cls._refill_rate)
+            cls._last_refill = now
+            
+            if cls._tokens < 1:
+                sleep_time = (1 - cls._tokens) / cls._refill_rate
+                logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
+                await asyncio.sleep(sleep_time)
+                cls._tokens = 0.0
+                cls._last_refill = time.monotonic()
+            else:
+                cls._tokens -= 1
     
-    def _make_request(self, params: Dict) -> Optional[Dict]:
-        """Make API request with rate limiting"""
+    async def _cache_get(self, key: str) -> Optional[Dict]:
+        """Get a cached API response"""
+        if not self.redis:
+            return None
         try:
-            self._rate_limit()
+            cached = await self.redis.get(key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+    
+    async def _cache_set(self, key: str, data: Dict, ttl: int):
+        """Cache an API response"""
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(key, json.dumps(data), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+    
+    async def _make_request(self, params: Dict) -> Optional[Dict]:
+        """Make API request with caching and rate limiting"""
+        try:
+            # Cached responses don't count against the API quota
+            cache_key = "av:" + hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return cached
             
-            params['apikey'] = self.api_key
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
+            await self._rate_limit()
             
-            data = response.json()
+            params['apikey'] = self.api_key
+            session = await self._get_session()
+            async with session.get(
+                self.base_url, params=params, timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
             
             # Check for API errors
-            if 'Error Message' in data:
-                logger.error(f"Alpha Vantage API error: {data['Error Message']}")
+            if (error := data.get('Error Message')):
+                logger.error(f"Alpha Vantage API error: {error}")
                 return None
-                
-            if 'Note' in data:
-                logger.warning(f"Alpha Vantage API note: {data['Note']}")
+            
+            if (note := data.get('Note')):
+                logger.warning(f"Alpha Vantage API note: {note}")
                 return None
-                
+            
+            await self._cache_set(cache_key, data, _cache_ttl(params))
             return data
             
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error(f"Request error: {e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             return None
     
-    def get_forex_intraday(self, symbol: str, interval: str = '5min') -> Optional[pd.DataFrame]:
+    async def get_forex_intraday(self, symbol: str, interval: str = '5min',
+                                 dtype: str = 'float32') -> Optional[pd.DataFrame]:
         """
         Get intraday forex data
         
         Args:
             symbol: Currency pair (e.g., 'EURUSD')
             interval: Time interval ('1min', '5min', '15min', '30min', '60min')
+            dtype: OHLCV dtype of the returned frame; use 'float64' for frames passed to save_to_database
         """
         try:
-            # Map symbol to Alpha Vantage format
-            av_symbol = self.symbol_mapping.get(symbol, symbol)
-            from_currency, to_currency = av_symbol.split('/')
+            # Map symbol to Alpha Vantage currency pair
+            from_currency, to_currency = self._av_pair.get(symbol) or symbol.split('/')
             
             params = {
                 'function': 'FX_INTRADAY',
@@ -103,7 +242,7 @@ class AlphaVantageService:
                 'outputsize': 'compact'  # Last 100 data points
             }
             
-            data = self._make_request(params)
+            data = await self._make_request(params)
             if not data:
                 return None
                 
@@ -115,33 +254,20 @@ class AlphaVantageService:
                 
             time_series = data[time_series_key]
             
-            # Convert to DataFrame
-            df_data = []
-            for timestamp, values in time_series.items():
-                df_data.append({
-                    'timestamp': pd.to_datetime(timestamp),
-                    'open': float(values['1. open']),
-                    'high': float(values['2. high']),
-                    'low': float(values['3. low']),
-                    'close': float(values['4. close']),
-                    'volume': 1000  # Alpha Vantage doesn't provide forex volume
-                })
-            
-            df = pd.DataFrame(df_data)
-            df = df.sort_values('timestamp').reset_index(drop=True)
+            # Convert to DataFrame (Alpha Vantage doesn't provide forex volume)
+            df = _parse_time_series(time_series, volume=1000.0)
             
             logger.info(f"Retrieved {len(df)} data points for {symbol}")
-            return df
+            return _with_dtype(df, dtype)
             
         except Exception as e:
             logger.error(f"Error getting forex intraday data for {symbol}: {e}")
             return None
     
-    def get_forex_daily(self, symbol: str) -> Optional[pd.DataFrame]:
-        """Get daily forex data"""
+    async def get_forex_daily(self, symbol: str, dtype: str = 'float32') -> Optional[pd.DataFrame]:
+        """Get daily forex data ('float64' dtype for frames passed to save_to_database)"""
         try:
-            av_symbol = self.symbol_mapping.get(symbol, symbol)
-            from_currency, to_currency = av_symbol.split('/')
+            from_currency, to_currency = self._av_pair.get(symbol) or symbol.split('/')
             
             params = {
                 'function': 'FX_DAILY',
@@ -150,37 +276,24 @@ class AlphaVantageService:
                 'outputsize': 'compact'
             }
             
-            data = self._make_request(params)
+            data = await self._make_request(params)
             if not data:
                 return None
                 
             time_series = data.get('Time Series FX (Daily)', {})
             
-            df_data = []
-            for date, values in time_series.items():
-                df_data.append({
-                    'timestamp': pd.to_datetime(date),
-                    'open': float(values['1. open']),
-                    'high': float(values['2. high']),
-                    'low': float(values['3. low']),
-                    'close': float(values['4. close']),
-                    'volume': 1000
-                })
+            df = _parse_time_series(time_series, volume=1000.0)
             
-            df = pd.DataFrame(df_data)
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            return df
+            return _with_dtype(df, dtype)
             
         except Exception as e:
             logger.error(f"Error getting forex daily data for {symbol}: {e}")
             return None
     
-    def get_current_price(self, symbol: str) -> Optional[Dict]:
+    async def get_current_price(self, symbol: str) -> Optional[Dict]:
         """Get current exchange rate"""
         try:
-            av_symbol = self.symbol_mapping.get(symbol, symbol)
-            from_currency, to_currency = av_symbol.split('/')
+            from_currency, to_currency = self._av_pair.get(symbol) or symbol.split('/')
             
             params = {
                 'function': 'CURRENCY_EXCHANGE_RATE',
@@ -188,7 +301,7 @@ class AlphaVantageService:
                 'to_currency': to_currency
             }
             
-            data = self._make_request(params)
+            data = await self._make_request(params)
             if not data:
                 return None
                 
@@ -213,8 +326,30 @@ class AlphaVantageService:
             logger.error(f"Error getting current price for {symbol}: {e}")
             return None
     
-    def get_crypto_intraday(self, symbol: str, interval: str = '5min') -> Optional[pd.DataFrame]:
-        """Get cryptocurrency intraday data"""
+    async def get_current_prices(self, symbols: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Get current exchange rates for several symbols concurrently
+        
+        Alpha Vantage has no batch quote endpoint, so the per-symbol requests are
+        overlapped instead; the shared token bucket still enforces the rate limit.
+        """
+        results = await asyncio.gather(
+            *(self.get_current_price(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+        
+        prices = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error getting current price for {symbol}: {result}")
+                result = None
+            prices[symbol] = result
+        
+        return prices
+    
+    async def get_crypto_intraday(self, symbol: str, interval: str = '5min',
+                                  dtype: str = 'float32') -> Optional[pd.DataFrame]:
+        """Get cryptocurrency intraday data ('float64' dtype for frames passed to save_to_database)"""
         try:
             # Extract crypto symbol (e.g., BTC from BTCUSD)
             crypto_symbol = symbol.replace('USD', '')
@@ -227,7 +362,7 @@ class AlphaVantageService:
                 'outputsize': 'compact'
             }
             
-            data = self._make_request(params)
+            data = await self._make_request(params)
             if not data:
                 return None
                 
@@ -238,21 +373,9 @@ class AlphaVantageService:
                 
             time_series = data[time_series_key]
             
-            df_data = []
-            for timestamp, values in time_series.items():
-                df_data.append({
-                    'timestamp': pd.to_datetime(timestamp),
-                    'open': float(values['1. open']),
-                    'high': float(values['2. high']),
-                    'low': float(values['3. low']),
-                    'close': float(values['4. close']),
-                    'volume': float(values['5. volume'])
-                })
+            df = _parse_time_series(time_series)
             
-            df = pd.DataFrame(df_data)
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            return df
+            return _with_dtype(df, dtype)
             
         except Exception as e:
             logger.error(f"Error getting crypto intraday data for {symbol}: {e}")
@@ -260,9 +383,9 @@ class AlphaVantageService:
     
     def get_supported_symbols(self) -> List[str]:
         """Get list of supported symbols"""
-        return list(self.symbol_mapping.keys())
+        return self._supported_symbols
     
-    def test_connection(self) -> bool:
+    async def test_connection(self) -> bool:
         """Test API connection"""
         try:
             # Test with a simple currency exchange rate call
@@ -272,7 +395,7 @@ class AlphaVantageService:
                 'to_currency': 'USD'
             }
             
-            data = self._make_request(params)
+            data = await self._make_request(params)
             return data is not None and 'Realtime Currency Exchange Rate' in data
             
         except Exception as e:
@@ -293,35 +416,51 @@ class AlphaVantageService:
         }
     
     def save_to_database(self, symbol: str, df: pd.DataFrame, timeframe: str):
-        """Save market data to database"""
+        """
+        Save market data to database, skipping bars that are already stored
+        
+        Pass frames fetched with dtype='float64'; float32 frames have already lost
+        quote precision beyond 7 significant digits.
+        """
         try:
-            for _, row in df.iterrows():
-                market_data = MarketData(
+            timestamps = df['timestamp'].tolist()
+            
+            # One query for every bar of this batch that already exists
+            existing = {
+                row[0] for row in self.db.query(MarketData.timestamp).filter(
+                    MarketData.symbol == symbol,
+                    MarketData.interval == timeframe,
+                    MarketData.timestamp.in_(timestamps)
+                ).all()
+            }
+            
+            records = [
+                MarketData(
                     symbol=symbol,
-                    timeframe=timeframe,
-                    timestamp=row['timestamp'],
-                    open_price=row['open'],
-                    high_price=row['high'],
-                    low_price=row['low'],
-                    close_price=row['close'],
-                    volume=row['volume'],
+                    interval=timeframe,
+                    timestamp=ts,
+                    open_price=o,
+                    high_price=h,
+                    low_price=l,
+                    close_price=c,
+                    volume=v,
                     source='Alpha Vantage'
                 )
-                
-                # Check if data already exists
-                existing = self.db.query(MarketData).filter(
-                    MarketData.symbol == symbol,
-                    MarketData.timeframe == timeframe,
-                    MarketData.timestamp == row['timestamp']
-                ).first()
-                
-                if not existing:
-                    self.db.add(market_data)
+                for ts, o, h, l, c, v in zip(
+                    timestamps,
+                    df['open'].astype('float64').tolist(),
+                    df['high'].astype('float64').tolist(),
+                    df['low'].astype('float64').tolist(),
+                    df['close'].astype('float64').tolist(),
+                    df['volume'].astype('float64').tolist()
+                )
+                if ts not in existing
+            ]
             
+            self.db.bulk_save_objects(records)
             self.db.commit()
-            logger.info(f"Saved {len(df)} data points for {symbol} to database")
+            logger.info(f"Saved {len(records)} new data points for {symbol} to database")
             
         except Exception as e:
             logger.error(f"Error saving data to database: {e}")
             self.db.rollback()
-
@@ -4,10 +4,15 @@ Generates and sends automated trading recommendations using AI/ML models.
 """
 
 import asyncio
-from datetime import datetime, timedelta
-import pytz
+import json
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pandas as pd
+from numba import njit
 from typing import Dict, List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from app.models.user import User
 from app.models.recommendation import Recommendation
 from app.models.market_data import MarketData
@@ -19,6 +24,93 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Timezones used when rendering recommendation messages
+_GAZA = ZoneInfo('Asia/Gaza')
+_UTC = timezone.utc
+
+# Pip size per symbol; JPY crosses and everything else fall back to the defaults below
+_PIP_VALUE = {
+    'XAUUSD': 0.1,
+    'BTCUSD': 0.1,
+    'ETHUSD': 0.1,
+    'US30': 1.0,
+    'US100': 1.0
+}
+_JPY_PIP = 0.01
+_DEFAULT_PIP = 0.0001
+
+@njit(cache=True)
+def _score(is_ob: bool, is_liq: bool, is_fvg: bool, rsi: float, macd: float,
+           is_buy: bool, is_sell: bool) -> float:
+    """Compiled success-probability scoring on primitive inputs."""
+    p = 0.5
+    
+    # ICT/SMC factors
+    if is_ob:
+        p += 0.15
+    if is_liq:
+        p += 0.10
+    if is_fvg:
+        p += 0.08
+    
+    # Technical indicators alignment
+    if (rsi < 30 and is_buy) or (rsi > 70 and is_sell):
+        p += 0.12
+    
+    # MACD confirmation
+    if (macd > 0 and is_buy) or (macd < 0 and is_sell):
+        p += 0.08
+    
+    # Cap at 95%
+    return 0.95 if p > 0.95 else p
+
+# Recommendation message templates, rendered with str.format_map
+_AR_TEMPLATE = """
+{premium_emoji} **توصية {symbol}** {direction_emoji}
+
+📊 **التحليل:** {strategy}
+🎯 **الاتجاه:** {signal_type}
+📈 **نوع الصفقة:** {trade_type}
+🎲 **نسبة النجاح:** {success_probability:.0%}
+💰 **اللوت المقترح:** {lot_size} لكل 100$
+
+🔹 **الدخول:** `{entry_price:.5f}`
+🎯 **الهدف الأول:** `{tp1_price:.5f}` ({tp1_pips} نقطة)
+🎯 **الهدف الثاني:** `{tp2_price:.5f}` ({tp2_pips} نقطة)
+🛑 **وقف الخسارة:** `{sl_price:.5f}` ({sl_pips} نقطة)
+
+📊 **نسبة المخاطرة:** R 1:{rr_ratio}
+
+⏰ **التوقيت:**
+🇵🇸 فلسطين: {palestine_time_str}
+🌍 غرينتش: {utc_time_str}
+
+💡 **ملاحظة:** تأكد من إدارة المخاطر وعدم المخاطرة بأكثر من 2% من رأس المال
+"""
+
+_EN_TEMPLATE = """
+{premium_emoji} **{symbol} Signal** {direction_emoji}
+
+📊 **Analysis:** {strategy}
+🎯 **Direction:** {signal_type}
+📈 **Trade Type:** {trade_type}
+🎲 **Success Rate:** {success_probability:.0%}
+💰 **Suggested Lot:** {lot_size} per $100
+
+🔹 **Entry:** `{entry_price:.5f}`
+🎯 **Target 1:** `{tp1_price:.5f}` ({tp1_pips} pips)
+🎯 **Target 2:** `{tp2_price:.5f}` ({tp2_pips} pips)
+🛑 **Stop Loss:** `{sl_price:.5f}` ({sl_pips} pips)
+
+📊 **Risk Ratio:** R 1:{rr_ratio}
+
+⏰ **Timing:**
+🇵🇸 Palestine: {palestine_time_str}
+🌍 GMT: {utc_time_str}
+
+💡 **Note:** Ensure proper risk management and don't risk more than 2% of capital
+"""
+
 class AutoRecommendationService:
     def __init__(self, db: Session, bot):
         self.db = db
@@ -39,35 +131,22 @@ class AutoRecommendationService:
             "US30",    # Dow Jones
             "US100"    # Nasdaq
         ]
+        
+        # Bound concurrent Telegram sends to stay under the bot API flood limit
+        self._send_semaphore = asyncio.Semaphore(20)
 
     def calculate_success_probability(self, analysis_data: Dict) -> float:
         """Calculate success probability based on multiple factors."""
-        base_probability = 0.5
-        
-        # ICT/SMC factors
-        if analysis_data.get('is_bullish_ob') or analysis_data.get('is_bearish_ob'):
-            base_probability += 0.15
-        
-        if analysis_data.get('is_liquidity_zone'):
-            base_probability += 0.10
-            
-        if analysis_data.get('is_bullish_fvg') or analysis_data.get('is_bearish_fvg'):
-            base_probability += 0.08
-        
-        # Technical indicators alignment
-        rsi = analysis_data.get('RSI', 50)
-        if (rsi < 30 and analysis_data.get('signal_type') == 'BUY') or \
-           (rsi > 70 and analysis_data.get('signal_type') == 'SELL'):
-            base_probability += 0.12
-        
-        # MACD confirmation
-        macd = analysis_data.get('MACD', 0)
-        if (macd > 0 and analysis_data.get('signal_type') == 'BUY') or \
-           (macd < 0 and analysis_data.get('signal_type') == 'SELL'):
-            base_probability += 0.08
-        
-        # Cap at 95%
-        return min(base_probability, 0.95)
+        signal_type = analysis_data.get('signal_type')
+        return _score(
+            bool(analysis_data.get('is_bullish_ob') or analysis_data.get('is_bearish_ob')),
+            bool(analysis_data.get('is_liquidity_zone')),
+            bool(analysis_data.get('is_bullish_fvg') or analysis_data.get('is_bearish_fvg')),
+            float(analysis_data.get('RSI', 50)),
+            float(analysis_data.get('MACD', 0)),
+            signal_type == 'BUY',
+            signal_type == 'SELL'
+        )
 
     def determine_trade_type(self, timeframe: str, expected_duration_hours: int) -> str:
         """Determine if trade is scalp, short-term, or long-term."""
@@ -86,124 +165,96 @@ class AutoRecommendationService:
 
     def calculate_pips(self, entry_price: float, target_price: float, symbol: str) -> int:
         """Calculate pips between entry and target."""
-        pip_value = 0.0001  # Default for most pairs
-        
-        if "JPY" in symbol:
-            pip_value = 0.01
-        elif symbol in ["XAUUSD", "BTCUSD", "ETHUSD"]:
-            pip_value = 0.1
-        elif symbol in ["US30", "US100"]:
-            pip_value = 1.0
-            
+        pip_value = _PIP_VALUE.get(symbol) or (_JPY_PIP if "JPY" in symbol else _DEFAULT_PIP)
         return int(abs(target_price - entry_price) / pip_value)
 
-    def format_recommendation_message(self, recommendation_data: Dict, lang: str = "ar") -> str:
-        """Format the recommendation message with all required details."""
+    def build_message_context(self, recommendation_data: Dict) -> Dict:
+        """Compute the language-independent values shown in a recommendation message."""
         symbol = recommendation_data['symbol']
         signal_type = recommendation_data['signal_type']
         entry_price = recommendation_data['entry_price']
         tp_levels = recommendation_data['tp_levels']
         sl_price = recommendation_data['sl_price']
-        success_probability = recommendation_data['success_probability']
-        trade_type = recommendation_data['trade_type']
-        strategy = recommendation_data['strategy']
-        lot_size = recommendation_data['lot_size']
         is_premium = recommendation_data.get('is_premium', False)
         
         # Timezone formatting
-        palestine_tz = pytz.timezone('Asia/Gaza')
-        utc_tz = pytz.timezone('UTC')
-        now = datetime.now(utc_tz)
-        palestine_time = now.astimezone(palestine_tz)
-        
-        palestine_time_str = palestine_time.strftime("%I:%M %p")
-        utc_time_str = now.strftime("%H:%M")
-        
-        # Emojis based on signal type and premium status
-        direction_emoji = "🟢" if signal_type == "BUY" else "🔴"
-        premium_emoji = "💎" if is_premium else "⭐"
+        now = datetime.now(_UTC)
+        palestine_time = now.astimezone(_GAZA)
         
         # Calculate R:R ratio
         tp1_pips = self.calculate_pips(entry_price, tp_levels[0], symbol)
         sl_pips = self.calculate_pips(entry_price, sl_price, symbol)
-        rr_ratio = round(tp1_pips / sl_pips, 1) if sl_pips > 0 else 1.0
         
-        if lang == "ar":
-            message = f"""
-{premium_emoji} **توصية {symbol}** {direction_emoji}
-
-📊 **التحليل:** {strategy}
-🎯 **الاتجاه:** {signal_type}
-📈 **نوع الصفقة:** {trade_type}
-🎲 **نسبة النجاح:** {success_probability:.0%}
-💰 **اللوت المقترح:** {lot_size} لكل 100$
-
-🔹 **الدخول:** `{entry_price:.5f}`
-🎯 **الهدف الأول:** `{tp_levels[0]:.5f}` ({tp1_pips} نقطة)
-🎯 **الهدف الثاني:** `{tp_levels[1]:.5f}` ({self.calculate_pips(entry_price, tp_levels[1], symbol)} نقطة)
-🛑 **وقف الخسارة:** `{sl_price:.5f}` ({sl_pips} نقطة)
-
-📊 **نسبة المخاطرة:** R 1:{rr_ratio}
-
-⏰ **التوقيت:**
-🇵🇸 فلسطين: {palestine_time_str}
-🌍 غرينتش: {utc_time_str}
-
-💡 **ملاحظة:** تأكد من إدارة المخاطر وعدم المخاطرة بأكثر من 2% من رأس المال
-"""
-        else:
-            message = f"""
-{premium_emoji} **{symbol} Signal** {direction_emoji}
-
-📊 **Analysis:** {strategy}
-🎯 **Direction:** {signal_type}
-📈 **Trade Type:** {trade_type}
-🎲 **Success Rate:** {success_probability:.0%}
-💰 **Suggested Lot:** {lot_size} per $100
-
-🔹 **Entry:** `{entry_price:.5f}`
-🎯 **Target 1:** `{tp_levels[0]:.5f}` ({tp1_pips} pips)
-🎯 **Target 2:** `{tp_levels[1]:.5f}` ({self.calculate_pips(entry_price, tp_levels[1], symbol)} pips)
-🛑 **Stop Loss:** `{sl_price:.5f}` ({sl_pips} pips)
-
-📊 **Risk Ratio:** R 1:{rr_ratio}
+        return {
+            'symbol': symbol,
+            'signal_type': signal_type,
+            'entry_price': entry_price,
+            'tp1_price': tp_levels[0],
+            'tp2_price': tp_levels[1],
+            'sl_price': sl_price,
+            'success_probability': recommendation_data['success_probability'],
+            'trade_type': recommendation_data['trade_type'],
+            'strategy': recommendation_data['strategy'],
+            'lot_size': recommendation_data['lot_size'],
+            # Emojis based on signal type and premium status
+            'direction_emoji': "🟢" if signal_type == "BUY" else "🔴",
+            'premium_emoji': "💎" if is_premium else "⭐",
+            'tp1_pips': tp1_pips,
+            'tp2_pips': self.calculate_pips(entry_price, tp_levels[1], symbol),
+            'sl_pips': sl_pips,
+            'rr_ratio': round(tp1_pips / sl_pips, 1) if sl_pips > 0 else 1.0,
+            'palestine_time_str': palestine_time.strftime("%I:%M %p"),
+            'utc_time_str': now.strftime("%H:%M")
+        }
 
-⏰ **Timing:**
-🇵🇸 Palestine: {palestine_time_str}
-🌍 GMT: {utc_time_str}
+    def format_recommendation_message(self, recommendation_data: Dict, lang: str = "ar",
+                                      context: Optional[Dict] = None) -> str:
+        """Format the recommendation message with all required details."""
+        if context is None:
+            context = self.build_message_context(recommendation_data)
+        
+        template = _AR_TEMPLATE if lang == "ar" else _EN_TEMPLATE
+        return template.format_map(context).strip()
 
-💡 **Note:** Ensure proper risk management and don't risk more than 2% of capital
-"""
+    def get_latest_market_data(self, symbols: List[str]) -> Dict[str, MarketData]:
+        """Get the most recent market data row for each symbol in a single query."""
+        ranked = self.db.query(
+            MarketData,
+            func.row_number().over(
+                partition_by=MarketData.symbol,
+                order_by=MarketData.timestamp.desc()
+            ).label('row_number')
+        ).filter(MarketData.symbol.in_(symbols)).subquery()
         
-        return message.strip()
+        latest = aliased(MarketData, ranked)
+        rows = self.db.query(latest).filter(ranked.c.row_number == 1).all()
+        return {row.symbol: row for row in rows}
 
-    async def generate_recommendation(self, symbol: str) -> Optional[Dict]:
+    async def generate_recommendation(self, symbol: str, latest_data: Optional[MarketData] = None) -> Optional[Dict]:
         """Generate a trading recommendation for a given symbol."""
         try:
-            # Get latest market data
-            latest_data = self.db.query(MarketData).filter(
-                MarketData.symbol == symbol
-            ).order_by(MarketData.timestamp.desc()).first()
+            # Get latest market data unless the caller already fetched it
+            if latest_data is None:
+                latest_data = self.db.query(MarketData).filter(
+                    MarketData.symbol == symbol
+                ).order_by(MarketData.timestamp.desc()).first()
             
             if not latest_data:
                 logger.warning(f"No market data found for {symbol}")
                 return None
             
-            # Convert to DataFrame for processing
-            data_dict = {
-                "symbol": [latest_data.symbol],
-                "timestamp": [latest_data.timestamp],
-                "open_price": [latest_data.open_price],
-                "high_price": [latest_data.high_price],
-                "low_price": [latest_data.low_price],
-                "close_price": [latest_data.close_price],
-                "volume": [latest_data.volume],
-                "interval": [latest_data.interval],
-                "source": [latest_data.source]
-            }
-            
-            import pandas as pd
-            df = pd.DataFrame(data_dict)
+            # Convert to a one-row DataFrame for processing
+            df = pd.DataFrame([{
+                "symbol": latest_data.symbol,
+                "timestamp": latest_data.timestamp,
+                "open_price": latest_data.open_price,
+                "high_price": latest_data.high_price,
+                "low_price": latest_data.low_price,
+                "close_price": latest_data.close_price,
+                "volume": latest_data.volume,
+                "interval": latest_data.interval,
+                "source": latest_data.source
+            }])
             
             # Process data and extract features
             processed_df = self.data_processor.extract_features(df)
@@ -270,65 +321,84 @@ class AutoRecommendationService:
             logger.error(f"Error generating recommendation for {symbol}: {e}")
             return None
 
+    def build_recommendation(self, recommendation_data: Dict, context: Dict,
+                             message_text: str) -> Recommendation:
+        """Map a generated recommendation onto the Recommendation columns."""
+        return Recommendation(
+            asset_pair=recommendation_data['symbol'],
+            trade_type=recommendation_data['signal_type'],
+            entry_points=json.dumps([float(recommendation_data['entry_price'])]),
+            tp=json.dumps([float(tp) for tp in recommendation_data['tp_levels']]),
+            sl=str(recommendation_data['sl_price']),
+            pips=context['tp1_pips'],
+            success_rate=recommendation_data['success_probability'] * 100,
+            trade_duration=recommendation_data['trade_type'],
+            rr_ratio=f"1:{context['rr_ratio']}",
+            lot_size_per_100=recommendation_data['lot_size'],
+            message_text=message_text,
+            is_premium=recommendation_data['is_premium'],
+            strategy=recommendation_data['strategy'],
+            is_live=True,
+            status="active"
+        )
+
     async def send_recommendation_to_users(self, recommendation_data: Dict):
         """Send recommendation to all subscribed users."""
         try:
-            # Get all active subscribers
-            active_users = self.db.query(User).filter(
-                User.is_subscribed == True,
-                User.subscription_end_date > datetime.now()
+            # Get all active subscribers (only the columns needed to send)
+            active_users = self.db.query(User.id, User.lang_code).filter(
+                User.is_subscribed.is_(True),
+                User.subscription_expiry > datetime.now()
             ).all()
             
             if not active_users:
                 logger.info("No active subscribers to send recommendations to")
                 return
             
+            # Message text and keyboard are the same for every user of a language
+            context = self.build_message_context(recommendation_data)
+            messages = {
+                lang: self.format_recommendation_message(recommendation_data, lang, context)
+                for lang in ("ar", "en")
+            }
+            
             # Save recommendation to database
-            recommendation = Recommendation(
-                symbol=recommendation_data['symbol'],
-                signal_type=recommendation_data['signal_type'],
-                entry_price=recommendation_data['entry_price'],
-                tp1_price=recommendation_data['tp_levels'][0],
-                tp2_price=recommendation_data['tp_levels'][1],
-                sl_price=recommendation_data['sl_price'],
-                success_probability=recommendation_data['success_probability'],
-                trade_type=recommendation_data['trade_type'],
-                strategy=recommendation_data['strategy'],
-                is_premium=recommendation_data['is_premium'],
-                status="ACTIVE"
-            )
+            recommendation = self.build_recommendation(recommendation_data, context, messages["ar"])
+            
+            # Commit before any send so no transaction stays open across the fan-out
+            try:
+                self.db.add(recommendation)
+                self.db.flush()
+                recommendation_id = recommendation.id
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
             
-            self.db.add(recommendation)
-            self.db.commit()
+            # Create inline keyboard for user interaction
+            keyboard = [
+                [InlineKeyboardButton("✅ دخلت الصفقة", callback_data=f"entered_{recommendation_id}")],
+                [InlineKeyboardButton("📊 تحديث الحالة", callback_data=f"update_{recommendation_id}")]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            
+            async def send_to_user(user):
+                async with self._send_semaphore:
+                    try:
+                        await self.bot.send_message(
+                            chat_id=user.id,
+                            text=messages["ar"] if user.lang_code == "ar" else messages["en"],
+                            parse_mode='Markdown',
+                            reply_markup=reply_markup
+                        )
+                        
+                        logger.info(f"Recommendation sent to user {user.id}")
+                        
+                    except Exception as e:
+                        logger.error(f"Failed to send recommendation to user {user.id}: {e}")
             
             # Send to users
-            for user in active_users:
-                try:
-                    message = self.format_recommendation_message(
-                        recommendation_data, 
-                        user.language
-                    )
-                    
-                    # Create inline keyboard for user interaction
-                    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-                    
-                    keyboard = [
-                        [InlineKeyboardButton("✅ دخلت الصفقة", callback_data=f"entered_{recommendation.id}")],
-                        [InlineKeyboardButton("📊 تحديث الحالة", callback_data=f"update_{recommendation.id}")]
-                    ]
-                    reply_markup = InlineKeyboardMarkup(keyboard)
-                    
-                    await self.bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=message,
-                        parse_mode='Markdown',
-                        reply_markup=reply_markup
-                    )
-                    
-                    logger.info(f"Recommendation sent to user {user.telegram_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to send recommendation to user {user.telegram_id}: {e}")
+            await asyncio.gather(*(send_to_user(user) for user in active_users))
             
             logger.info(f"Recommendation for {recommendation_data['symbol']} sent to {len(active_users)} users")
             
@@ -339,19 +409,35 @@ class AutoRecommendationService:
         """Main method to monitor market and generate recommendations."""
         logger.info("Starting recommendation monitoring...")
         
+        # Latest bar for every pair in one round-trip
+        try:
+            latest_by_symbol = self.get_latest_market_data(self.supported_pairs)
+        except Exception as e:
+            logger.error(f"Error fetching latest market data: {e}")
+            return
+        
         for symbol in self.supported_pairs:
+            if symbol not in latest_by_symbol:
+                logger.warning(f"No market data found for {symbol}")
+        symbols = [symbol for symbol in self.supported_pairs if symbol in latest_by_symbol]
+        
+        # Generation is synchronous work (DB + model), so run it pair by pair;
+        # one failing symbol doesn't stop the rest
+        recommendations = []
+        for symbol in symbols:
             try:
-                recommendation_data = await self.generate_recommendation(symbol)
-                
-                if recommendation_data:
-                    logger.info(f"Generated recommendation for {symbol}: {recommendation_data['signal_type']}")
-                    await self.send_recommendation_to_users(recommendation_data)
-                    
-                    # Add delay between recommendations to avoid spam
-                    await asyncio.sleep(2)
-                    
+                result = await self.generate_recommendation(symbol, latest_by_symbol[symbol])
             except Exception as e:
                 logger.error(f"Error processing {symbol}: {e}")
+                continue
+            if result:
+                logger.info(f"Generated recommendation for {symbol}: {result['signal_type']}")
+                recommendations.append(result)
+        
+        await asyncio.gather(
+            *(self.send_recommendation_to_users(rec) for rec in recommendations),
+            return_exceptions=True
+        )
         
         logger.info("Recommendation monitoring cycle completed")
 
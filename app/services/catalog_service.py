@@ -2,11 +2,33 @@
 Catalog Service for HOT SHARK Bot
 Provides market schedules, news calendar, and liquidity information
 """
-from datetime import datetime, timedelta
+import functools
+from datetime import datetime, timedelta, time
+from time import monotonic
 import pytz
 from typing import Dict, List
 from app.utils.localization import get_text
 
+# Timezone objects are built once and shared by every call
+_PALESTINE_TZ = pytz.timezone('Asia/Gaza')
+_UTC = pytz.UTC
+
+def _cached_per_minute(func):
+    """Cache a text builder per (lang_code, current minute) so the entry lives at most a minute"""
+    cache = {}
+    
+    @functools.wraps(func)
+    def wrapper(cls, lang_code: str = 'ar') -> str:
+        key = (lang_code, int(datetime.now(_UTC).timestamp()) // 60)
+        text = cache.get(key)
+        if text is None:
+            if len(cache) >= 16:
+                cache.clear()  # Entries from past minutes are never read again
+            text = cache[key] = func(cls, lang_code)
+        return text
+    
+    return wrapper
+
 class CatalogService:
     """Service for providing market information catalogs"""
     
@@ -26,14 +48,52 @@ class CatalogService:
         {'name': 'Asian Session', 'time': '23:00', 'duration': 3}
     ]
     
+    # Today's news rows keyed by ISO date: (fetched_at, rows)
+    _NEWS_CACHE_TTL = 60
+    _news_cache: Dict[str, tuple] = {}
+    
+    # Supported trading pairs: (symbol, description, category)
+    TRADING_PAIRS = [
+        ('🥇 XAUUSD', 'Gold vs US Dollar', 'Precious Metal'),
+        ('₿ BTCUSD', 'Bitcoin vs US Dollar', 'Cryptocurrency'),
+        ('⟠ ETHUSD', 'Ethereum vs US Dollar', 'Cryptocurrency'),
+        ('🇪🇺 EURUSD', 'Euro vs US Dollar', 'Major Pair'),
+        ('🇬🇧 GBPJPY', 'British Pound vs Japanese Yen', 'Cross Pair'),
+        ('🇬🇧 GBPUSD', 'British Pound vs US Dollar', 'Major Pair'),
+        ('🇺🇸 USDJPY', 'US Dollar vs Japanese Yen', 'Major Pair'),
+        ('📊 US30', 'Dow Jones Industrial Average', 'Index'),
+        ('💻 US100', 'NASDAQ 100', 'Index')
+    ]
+    
+    # The pairs text is language independent, so it is rendered once
+    _PAIRS_BODY = ''.join(
+        f"{symbol}\n📋 {description}\n🏷️ {category}\n\n"
+        for symbol, description, category in TRADING_PAIRS
+    )
+    
+    # Pre-parsed forms of the tables above: (market, open time)
+    _MARKET_OPEN_TIMES = tuple(
+        (market, time(int(times['open'][:2]), int(times['open'][3:5])))
+        for market, times in MARKET_SESSIONS.items()
+    )
+    # (period, start time, end time) with the end wrapping past midnight
+    _LIQUIDITY_PERIOD_TIMES = tuple(
+        (
+            period,
+            time(int(period['time'][:2]), int(period['time'][3:5])),
+            time((int(period['time'][:2]) + period['duration']) % 24, int(period['time'][3:5]))
+        )
+        for period in HIGH_LIQUIDITY_PERIODS
+    )
+    
     @classmethod
+    @_cached_per_minute
     def get_market_schedule(cls, lang_code: str = 'ar') -> str:
         """Get formatted market opening schedule"""
-        now_gmt = datetime.now(pytz.UTC)
-        palestine_tz = pytz.timezone('Asia/Gaza')
-        now_palestine = now_gmt.astimezone(palestine_tz)
+        now_gmt = datetime.now(_UTC)
+        now_palestine = now_gmt.astimezone(_PALESTINE_TZ)
         
-        schedule_text = f"📅 {get_text('market_schedule', lang_code)}\n\n"
+        parts = [f"📅 {get_text('market_schedule', lang_code)}\n\n"]
         
         # Market sessions
         sessions = [
@@ -44,161 +104,159 @@ class CatalogService:
         ]
         
         for session_name, gmt_time, palestine_time in sessions:
-            schedule_text += f"{session_name}\n"
-            schedule_text += f"⏰ GMT: {gmt_time}\n"
-            schedule_text += f"🇵🇸 Palestine: {palestine_time}\n\n"
+            parts.append(f"{session_name}\n")
+            parts.append(f"⏰ GMT: {gmt_time}\n")
+            parts.append(f"🇵🇸 Palestine: {palestine_time}\n\n")
         
         # Current time
-        schedule_text += f"🕐 {get_text('current_time', lang_code)}:\n"
-        schedule_text += f"GMT: {now_gmt.strftime('%H:%M')}\n"
-        schedule_text += f"Palestine: {now_palestine.strftime('%I:%M %p')}\n\n"
+        parts.append(f"🕐 {get_text('current_time', lang_code)}:\n")
+        parts.append(f"GMT: {now_gmt.strftime('%H:%M')}\n")
+        parts.append(f"Palestine: {now_palestine.strftime('%I:%M %p')}\n\n")
         
         # Next market opening
         next_opening = cls._get_next_market_opening()
         if next_opening:
-            schedule_text += f"🔔 {get_text('next_market_opening', lang_code)}: {next_opening}\n"
+            parts.append(f"🔔 {get_text('next_market_opening', lang_code)}: {next_opening}\n")
         
-        return schedule_text
+        return ''.join(parts)
     
     @classmethod
+    @_cached_per_minute
     def get_liquidity_schedule(cls, lang_code: str = 'ar') -> str:
         """Get high liquidity periods schedule"""
-        schedule_text = f"💧 {get_text('high_liquidity_periods', lang_code)}\n\n"
+        parts = [f"💧 {get_text('high_liquidity_periods', lang_code)}\n\n"]
         
-        for period in cls.HIGH_LIQUIDITY_PERIODS:
+        today = datetime.now().date()
+        for period, gmt_time, _ in cls._LIQUIDITY_PERIOD_TIMES:
             # Convert GMT to Palestine time
-            gmt_time = datetime.strptime(period['time'], '%H:%M').time()
-            palestine_time = cls._convert_gmt_to_palestine(gmt_time)
+            palestine_time = cls._convert_gmt_to_palestine(gmt_time, today)
             
-            schedule_text += f"🔥 {period['name']}\n"
-            schedule_text += f"⏰ GMT: {period['time']} ({period['duration']}h)\n"
-            schedule_text += f"🇵🇸 Palestine: {palestine_time.strftime('%I:%M %p')} ({period['duration']}h)\n\n"
+            parts.append(f"🔥 {period['name']}\n")
+            parts.append(f"⏰ GMT: {period['time']} ({period['duration']}h)\n")
+            parts.append(f"🇵🇸 Palestine: {palestine_time.strftime('%I:%M %p')} ({period['duration']}h)\n\n")
         
         # Current liquidity status
         current_liquidity = cls._get_current_liquidity_status()
-        schedule_text += f"📊 {get_text('current_liquidity', lang_code)}: {current_liquidity}\n"
+        parts.append(f"📊 {get_text('current_liquidity', lang_code)}: {current_liquidity}\n")
         
-        return schedule_text
+        return ''.join(parts)
     
     @classmethod
-    def get_news_calendar(cls, lang_code: str = 'ar') -> str:
-        """Get economic news calendar for today"""
+    def _get_today_news(cls, today) -> list:
+        """Get today's news rows, cached for _NEWS_CACHE_TTL seconds since the calendar changes slowly"""
+        key = today.isoformat()
+        cached = cls._news_cache.get(key)
+        if cached and monotonic() - cached[0] < cls._NEWS_CACHE_TTL:
+            return cached[1]
+        
         from app.models.news import News
         from app.models.database import SessionLocal
         
         db = SessionLocal()
         try:
-            today = datetime.now().date()
-            tomorrow = today + timedelta(days=1)
+            # Midnight datetimes match the column type so the ix_news_time range scan applies
+            day_start = datetime.combine(today, time.min)
+            day_end = day_start + timedelta(days=1)
             
-            # Get today's news
-            today_news = db.query(News).filter(
-                News.time >= today,
-                News.time < tomorrow
-            ).order_by(News.time).all()
+            # Only the columns rendered by get_news_calendar, streamed in batches
+            rows = list(db.query(
+                News.title,
+                News.time,
+                News.impact,
+                News.is_critical,
+                News.currency,
+                News.description
+            ).filter(
+                News.time >= day_start,
+                News.time < day_end
+            ).order_by(News.time).yield_per(200))
+        finally:
+            db.close()
+        
+        # Replacing the dict drops entries for previous days
+        cls._news_cache = {key: (monotonic(), rows)}
+        return rows
+    
+    @classmethod
+    def get_news_calendar(cls, lang_code: str = 'ar') -> str:
+        """Get economic news calendar for today"""
+        today = datetime.now().date()
+        today_news = cls._get_today_news(today)
+        
+        parts = [f"📰 {get_text('news_calendar', lang_code)} - {today.strftime('%Y-%m-%d')}\n\n"]
+        
+        if not today_news:
+            parts.append(f"{get_text('no_news_today', lang_code)}\n")
+            return ''.join(parts)
+        
+        pal_tz = _PALESTINE_TZ
+        for news in today_news:
+            # Convert to Palestine time
+            palestine_time = news.time.astimezone(pal_tz)
             
-            calendar_text = f"📰 {get_text('news_calendar', lang_code)} - {today.strftime('%Y-%m-%d')}\n\n"
+            impact_emoji = {
+                'low': '🟢',
+                'medium': '🟡',
+                'high': '🔴'
+            }.get(news.impact, '⚪')
             
-            if not today_news:
-                calendar_text += f"{get_text('no_news_today', lang_code)}\n"
-                return calendar_text
+            critical_emoji = '🚨' if news.is_critical else ''
             
-            for news in today_news:
-                # Convert to Palestine time
-                palestine_time = news.time.astimezone(pytz.timezone('Asia/Gaza'))
-                
-                impact_emoji = {
-                    'low': '🟢',
-                    'medium': '🟡',
-                    'high': '🔴'
-                }.get(news.impact, '⚪')
-                
-                critical_emoji = '🚨' if news.is_critical else ''
-                
-                calendar_text += f"{impact_emoji} {critical_emoji} {news.title}\n"
-                calendar_text += f"⏰ {palestine_time.strftime('%I:%M %p')} Palestine\n"
-                calendar_text += f"💱 {news.currency or 'Multiple'}\n"
-                
-                if news.description:
-                    calendar_text += f"📝 {news.description}\n"
-                
-                calendar_text += "\n"
+            parts.append(f"{impact_emoji} {critical_emoji} {news.title}\n")
+            parts.append(f"⏰ {palestine_time.strftime('%I:%M %p')} Palestine\n")
+            parts.append(f"💱 {news.currency or 'Multiple'}\n")
             
-            return calendar_text
+            if news.description:
+                parts.append(f"📝 {news.description}\n")
             
-        finally:
-            db.close()
+            parts.append("\n")
+        
+        return ''.join(parts)
     
     @classmethod
+    @functools.lru_cache(maxsize=8)
     def get_trading_pairs_info(cls, lang_code: str = 'ar') -> str:
         """Get information about supported trading pairs"""
-        pairs_info = f"📈 {get_text('supported_pairs', lang_code)}\n\n"
-        
-        pairs = [
-            ('🥇 XAUUSD', 'Gold vs US Dollar', 'Precious Metal'),
-            ('₿ BTCUSD', 'Bitcoin vs US Dollar', 'Cryptocurrency'),
-            ('⟠ ETHUSD', 'Ethereum vs US Dollar', 'Cryptocurrency'),
-            ('🇪🇺 EURUSD', 'Euro vs US Dollar', 'Major Pair'),
-            ('🇬🇧 GBPJPY', 'British Pound vs Japanese Yen', 'Cross Pair'),
-            ('🇬🇧 GBPUSD', 'British Pound vs US Dollar', 'Major Pair'),
-            ('🇺🇸 USDJPY', 'US Dollar vs Japanese Yen', 'Major Pair'),
-            ('📊 US30', 'Dow Jones Industrial Average', 'Index'),
-            ('💻 US100', 'NASDAQ 100', 'Index')
-        ]
-        
-        for symbol, description, category in pairs:
-            pairs_info += f"{symbol}\n"
-            pairs_info += f"📋 {description}\n"
-            pairs_info += f"🏷️ {category}\n\n"
-        
-        return pairs_info
+        return f"📈 {get_text('supported_pairs', lang_code)}\n\n{cls._PAIRS_BODY}"
     
     @classmethod
     def _get_next_market_opening(cls) -> str:
         """Get next market opening time"""
-        now_gmt = datetime.now(pytz.UTC)
+        now_gmt = datetime.now(_UTC)
+        today_gmt = now_gmt.date()
+        now_time = now_gmt.time()
         
         # Check each market session
-        for market, times in cls.MARKET_SESSIONS.items():
-            open_time = datetime.strptime(times['open'], '%H:%M').time()
-            open_datetime = datetime.combine(now_gmt.date(), open_time)
-            open_datetime = pytz.UTC.localize(open_datetime)
-            
+        for market, open_time in cls._MARKET_OPEN_TIMES:
             # If opening time is in the future today
-            if open_datetime > now_gmt:
-                palestine_time = open_datetime.astimezone(pytz.timezone('Asia/Gaza'))
+            if open_time > now_time:
+                open_datetime = datetime.combine(today_gmt, open_time, tzinfo=_UTC)
+                palestine_time = open_datetime.astimezone(_PALESTINE_TZ)
                 return f"{market.title()} - {palestine_time.strftime('%I:%M %p')} Palestine"
         
         # If no opening today, check tomorrow
-        tomorrow = now_gmt.date() + timedelta(days=1)
-        for market, times in cls.MARKET_SESSIONS.items():
-            open_time = datetime.strptime(times['open'], '%H:%M').time()
-            open_datetime = datetime.combine(tomorrow, open_time)
-            open_datetime = pytz.UTC.localize(open_datetime)
-            palestine_time = open_datetime.astimezone(pytz.timezone('Asia/Gaza'))
+        tomorrow = today_gmt + timedelta(days=1)
+        for market, open_time in cls._MARKET_OPEN_TIMES:
+            open_datetime = datetime.combine(tomorrow, open_time, tzinfo=_UTC)
+            palestine_time = open_datetime.astimezone(_PALESTINE_TZ)
             return f"{market.title()} (Tomorrow) - {palestine_time.strftime('%I:%M %p')} Palestine"
         
         return "Unknown"
     
     @classmethod
-    def _convert_gmt_to_palestine(cls, gmt_time) -> datetime.time:
-        """Convert GMT time to Palestine time"""
+    def _convert_gmt_to_palestine(cls, gmt_time, day=None) -> datetime.time:
+        """Convert GMT time to Palestine time on the given day (defaults to today)"""
         # Palestine is GMT+2 (GMT+3 during DST)
-        gmt_datetime = datetime.combine(datetime.now().date(), gmt_time)
-        gmt_datetime = pytz.UTC.localize(gmt_datetime)
-        palestine_datetime = gmt_datetime.astimezone(pytz.timezone('Asia/Gaza'))
+        gmt_datetime = datetime.combine(day or datetime.now().date(), gmt_time, tzinfo=_UTC)
+        palestine_datetime = gmt_datetime.astimezone(_PALESTINE_TZ)
         return palestine_datetime.time()
     
     @classmethod
     def _get_current_liquidity_status(cls) -> str:
         """Get current market liquidity status"""
-        now_gmt = datetime.now(pytz.UTC).time()
+        now_gmt = datetime.now(_UTC).time()
         
-        for period in cls.HIGH_LIQUIDITY_PERIODS:
-            start_time = datetime.strptime(period['time'], '%H:%M').time()
-            end_time = (datetime.combine(datetime.now().date(), start_time) + 
-                       timedelta(hours=period['duration'])).time()
-            
+        for period, start_time, end_time in cls._LIQUIDITY_PERIOD_TIMES:
             if start_time <= now_gmt <= end_time:
                 return f"🔥 High ({period['name']})"
         
@@ -5,105 +5,170 @@ Handles fetching real-time and historical market data from various APIs.
 
 import os
 import httpx
+import orjson
 import asyncio
+import pandas as pd
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from sqlalchemy.orm import Session
-from app.models.market_data import MarketData
+from app.models.market_data import insert_market_data
 from app.config import Config
 
+# Interval name -> (multiplier, timespan) for Polygon's aggregates endpoint
+_POLYGON_TIMESPAN = {
+    "1min": (1, "minute"), "1m": (1, "minute"),
+    "5min": (5, "minute"), "5m": (5, "minute"),
+    "15min": (15, "minute"), "15m": (15, "minute"),
+    "30min": (30, "minute"), "30m": (30, "minute"),
+    "1h": (1, "hour"), "1hour": (1, "hour"),
+    "4h": (4, "hour"), "4hour": (4, "hour"),
+    "1d": (1, "day"), "1day": (1, "day"),
+}
+
 class DataCollectorService:
+    # One pooled HTTP/2 client shared by every collector instance
+    _client: Optional[httpx.AsyncClient] = None
+
+    SOURCES = ("TwelveData", "Polygon.io", "AlphaVantage")
+
     def __init__(self, db: Session):
         self.db = db
         self.twelve_data_api_key = getattr(Config, 'TWELVE_DATA_API_KEY', None)
         self.polygon_api_key = getattr(Config, 'POLYGON_API_KEY', None)
         self.alpha_vantage_api_key = getattr(Config, 'ALPHA_VANTAGE_API_KEY', None)
 
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                http2=True,
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=20)
+            )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared HTTP client"""
+        if cls._client is not None and not cls._client.is_closed:
+            await cls._client.aclose()
+
     async def fetch_twelve_data(self, symbol: str, interval: str = "1min", outputsize: int = 100) -> List[Dict[str, Any]]:
         url = f"https://api.twelvedata.com/time_series?symbol={symbol}&interval={interval}&outputsize={outputsize}&apikey={self.twelve_data_api_key}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            if data and "values" in data:
-                return data["values"]
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if data and "values" in data:
+            return data["values"]
         return []
 
     async def fetch_polygon_data(self, symbol: str, multiplier: int = 1, timespan: str = "minute", from_date: str = None, to_date: str = None) -> List[Dict[str, Any]]:
         if not from_date: from_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
         if not to_date: to_date = datetime.now().strftime("%Y-%m-%d")
         url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/{from_date}/{to_date}?adjusted=true&sort=asc&limit=50000&apiKey={self.polygon_api_key}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            if data and "results" in data:
-                return data["results"]
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if data and "results" in data:
+            return data["results"]
         return []
 
     async def fetch_alpha_vantage_data(self, symbol: str, interval: str = "1min", outputsize: str = "compact") -> Dict[str, Any]:
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={symbol}&interval={interval}&outputsize={outputsize}&apikey={self.alpha_vantage_api_key}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            if data and f"Time Series ({interval})" in data:
-                return data[f"Time Series ({interval})"]
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if data and f"Time Series ({interval})" in data:
+            return data[f"Time Series ({interval})"]
         return {}
 
-    async def collect_and_store_data(self, symbol: str, interval: str = "1min", source: str = "TwelveData"):
-        data_to_store = []
+    async def _fetch_source(self, symbol: str, interval: str, source: str):
+        """Fetch raw bars for one source in that source's own response shape"""
+        if source == "TwelveData":
+            return await self.fetch_twelve_data(symbol, interval)
+        elif source == "Polygon.io":
+            multiplier, timespan = _POLYGON_TIMESPAN.get(interval, (1, "minute"))
+            return await self.fetch_polygon_data(symbol, multiplier=multiplier, timespan=timespan)
+        elif source == "AlphaVantage":
+            return await self.fetch_alpha_vantage_data(symbol, interval)
+        return []
+
+    def _build_records(self, symbol: str, interval: str, source: str, raw_data) -> List[Dict[str, Any]]:
+        """Convert a source's raw response into MarketData insert mappings"""
+        if not raw_data:
+            return []
+
         if source == "TwelveData":
-            raw_data = await self.fetch_twelve_data(symbol, interval)
-            for entry in raw_data:
-                data_to_store.append(MarketData(
-                    symbol=symbol,
-                    timestamp=datetime.strptime(entry["datetime"], "%Y-%m-%d %H:%M:%S"),
-                    open_price=float(entry["open"]),
-                    high_price=float(entry["high"]),
-                    low_price=float(entry["low"]),
-                    close_price=float(entry["close"]),
-                    volume=float(entry["volume"]) if "volume" in entry else 0,
-                    interval=interval,
-                    source=source
-                ))
+            df = pd.DataFrame(raw_data)
+            timestamps = pd.to_datetime(df["datetime"], format="%Y-%m-%d %H:%M:%S")
+            columns = {"open": "open_price", "high": "high_price", "low": "low_price", "close": "close_price", "volume": "volume"}
         elif source == "Polygon.io":
-            raw_data = await self.fetch_polygon_data(symbol, timespan=interval.replace("m", "minute").replace("h", "hour").replace("d", "day"))
-            for entry in raw_data:
-                data_to_store.append(MarketData(
-                    symbol=symbol,
-                    timestamp=datetime.fromtimestamp(entry["t"] / 1000), # Convert milliseconds to seconds
-                    open_price=float(entry["o"]),
-                    high_price=float(entry["h"]),
-                    low_price=float(entry["l"]),
-                    close_price=float(entry["c"]),
-                    volume=float(entry["v"]) if "v" in entry else 0,
-                    interval=interval,
-                    source=source
-                ))
+            df = pd.DataFrame(raw_data)
+            timestamps = pd.to_datetime(df["t"], unit="ms")  # Polygon timestamps are epoch milliseconds
+            columns = {"o": "open_price", "h": "high_price", "l": "low_price", "c": "close_price", "v": "volume"}
         elif source == "AlphaVantage":
-            raw_data = await self.fetch_alpha_vantage_data(symbol, interval)
-            for dt_str, values in raw_data.items():
-                data_to_store.append(MarketData(
-                    symbol=symbol,
-                    timestamp=datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S"),
-                    open_price=float(values["1. open"]),
-                    high_price=float(values["2. high"]),
-                    low_price=float(values["3. low"]),
-                    close_price=float(values["4. close"]),
-                    volume=float(values["5. volume"]) if "5. volume" in values else 0,
-                    interval=interval,
-                    source=source
-                ))
+            df = pd.DataFrame.from_dict(raw_data, orient="index")
+            timestamps = pd.to_datetime(df.index, format="%Y-%m-%d %H:%M:%S")
+            columns = {"1. open": "open_price", "2. high": "high_price", "3. low": "low_price", "4. close": "close_price", "5. volume": "volume"}
+        else:
+            return []
+
+        # Volume is optional in every feed; default it to zero like the per-row parser did
+        df = df.reindex(columns=list(columns), fill_value=0)
+
+        records = df.astype("float64").rename(columns=columns)
+        records.insert(0, "timestamp", timestamps)
+        records.insert(0, "symbol", symbol)
+        records["volume"] = records["volume"].fillna(0)
+        records["interval"] = interval
+        records["source"] = source
+        return records.to_dict("records")
+
+    async def collect_and_store_data(self, symbol: str, interval: str = "1min", source: str = "TwelveData"):
+        raw_data = await self._fetch_source(symbol, interval, source)
+        data_to_store = self._build_records(symbol, interval, source, raw_data)
 
         if data_to_store:
-            self.db.add_all(data_to_store)
+            insert_market_data(self.db, data_to_store)
             self.db.commit()
             print(f"Successfully collected and stored {len(data_to_store)} data points for {symbol} from {source}")
         else:
             print(f"No data collected for {symbol} from {source}")
 
+    async def collect_all(self, symbol: str, interval: str = "1min"):
+        """Fetch every source concurrently and store the combined rows in one transaction"""
+        results = await asyncio.gather(
+            *(self._fetch_source(symbol, interval, source) for source in self.SOURCES),
+            return_exceptions=True
+        )
+
+        data_to_store = []
+        collected_from = []
+        for source, raw_data in zip(self.SOURCES, results):
+            if isinstance(raw_data, Exception):
+                print(f"Error collecting {symbol} from {source}: {raw_data}")
+                continue
+            records = self._build_records(symbol, interval, source, raw_data)
+            if records:
+                collected_from.append(source)
+                data_to_store.extend(records)
+
+        if data_to_store:
+            try:
+                insert_market_data(self.db, data_to_store)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            # The bar key has no source, so the first source listed wins each bar and
+            # the others' copies are skipped
+            print(f"Collected {len(data_to_store)} data points for {symbol} from {', '.join(collected_from)}; "
+                  f"bars already stored are skipped (first source wins)")
+        else:
+            print(f"No data collected for {symbol} from any source")
+
 # Example usage (for testing purposes, not part of the main app flow)
 async def main():
     from app.models.database import SessionLocal
@@ -119,6 +184,7 @@ async def main():
         print(f"An error occurred: {e}")
     finally:
         db.close()
+        await DataCollectorService.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
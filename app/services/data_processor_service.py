@@ -3,8 +3,10 @@ Data processing service for HOT SHARK Bot.
 Handles cleaning, transforming, and feature engineering for market data.
 """
 
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Any
+from app.services._indicator_kernels import compute_all
 from app.services.ict_smc_analyzer_service import ICTSMCAnalyzerService
 
 class DataProcessorService:
@@ -14,78 +16,77 @@ class DataProcessorService:
     def clean_data(self, data: List[Dict[str, Any]]) -> pd.DataFrame:
         """Cleans raw market data and converts it to a pandas DataFrame."""
         df = pd.DataFrame(data)
-        # Convert timestamp to datetime objects
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Convert timestamp to datetime objects (explicit format skips per-value inference)
+        if 'timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
         
-        # Handle missing values (e.g., fill with previous values or 0)
-        df = df.fillna(0) # Simple fill for now, can be more sophisticated
-        
-        # Ensure numeric types
-        numeric_cols = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        # Ensure numeric types (other gaps are filled once at the end of extract_features)
+        numeric_cols = [col for col in ('open_price', 'high_price', 'low_price', 'close_price', 'volume') if col in df.columns]
+        to_convert = [col for col in numeric_cols if not pd.api.types.is_numeric_dtype(df[col])]
+        if to_convert:
+            df[to_convert] = df[to_convert].apply(pd.to_numeric, errors='coerce')
+        if numeric_cols and df[numeric_cols].isna().values.any():
+            df[numeric_cols] = df[numeric_cols].fillna(0)
         
         return df
 
     def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Calculates common technical indicators and adds them to the DataFrame."""
-        # Simple Moving Average (SMA)
-        if 'close_price' in df.columns:
-            df['SMA_10'] = df['close_price'].rolling(window=10).mean()
-            df['SMA_20'] = df['close_price'].rolling(window=20).mean()
-
-        # Relative Strength Index (RSI)
-        if 'close_price' in df.columns:
-            delta = df['close_price'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            df['RSI'] = 100 - (100 / (1 + rs))
-
-        # Moving Average Convergence Divergence (MACD)
-        if 'close_price' in df.columns:
-            exp1 = df['close_price'].ewm(span=12, adjust=False).mean()
-            exp2 = df['close_price'].ewm(span=26, adjust=False).mean()
-            df['MACD'] = exp1 - exp2
-            df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-            df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
-
-        # Bollinger Bands
-        if 'close_price' in df.columns:
-            df['BB_Middle'] = df['close_price'].rolling(window=20).mean()
-            df['BB_StdDev'] = df['close_price'].rolling(window=20).std()
-            df['BB_Upper'] = df['BB_Middle'] + (df['BB_StdDev'] * 2)
-            df['BB_Lower'] = df['BB_Middle'] - (df['BB_StdDev'] * 2)
-
-        return df.fillna(0) # Fill NaN values created by rolling/ewm calculations
+        """Calculates common technical indicators and returns them joined to the DataFrame.
+        The input frame is left unmodified, so callers do not need to copy it first.
+        """
+        if 'close_price' not in df.columns:
+            return df
+
+        # SMA, RSI, MACD and Bollinger Bands in one fused pass (see _indicator_kernels)
+        close = np.ascontiguousarray(df['close_price'].to_numpy(dtype=np.float64))
+        sma10, sma20, rsi, macd, signal, hist, bb_mid, bb_std = compute_all(close)
+
+        indicators = pd.DataFrame({
+            'SMA_10': sma10,
+            'SMA_20': sma20,
+            'RSI': rsi,
+            'MACD': macd,
+            'Signal_Line': signal,
+            'MACD_Histogram': hist,
+            'BB_Middle': bb_mid,
+            'BB_StdDev': bb_std,
+            'BB_Upper': bb_mid + bb_std * 2,
+            'BB_Lower': bb_mid - bb_std * 2
+        }, index=df.index)
+        # Join without duplicating the existing OHLCV blocks
+        df = pd.concat([df.drop(columns=df.columns.intersection(indicators.columns)), indicators], axis=1, copy=False)
+
+        return df # Warm-up NaNs are filled once at the end of extract_features
 
     def extract_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Extracts features suitable for ML models from the DataFrame.
         Includes technical indicators and ICT/SMC concepts.
         """
-        # Add technical indicators
-        df = self.calculate_technical_indicators(df.copy())
+        # Add technical indicators (returns a new frame, the caller's df is untouched)
+        df = self.calculate_technical_indicators(df)
 
-        # Add ICT/SMC concepts
-        df = self.ict_smc_analyzer.analyze(df.copy())
+        # Add ICT/SMC concepts (analyze works on its own copy)
+        df = self.ict_smc_analyzer.analyze(df)
+
+        close = df['close_price'] if 'close_price' in df.columns else None
 
         # Example: Lagged prices
-        if 'close_price' in df.columns:
-            df['close_price_lag1'] = df['close_price'].shift(1)
-            df['close_price_lag5'] = df['close_price'].shift(5)
+        if close is not None:
+            df['close_price_lag1'] = close.shift(1)
+            df['close_price_lag5'] = close.shift(5)
 
         # Price change
-        if 'close_price' in df.columns and 'open_price' in df.columns:
-            df['price_change'] = df['close_price'] - df['open_price']
+        if close is not None and 'open_price' in df.columns:
+            df['price_change'] = close - df['open_price']
             df['daily_range'] = df['high_price'] - df['low_price']
 
         # Interaction features (example)
         if 'RSI' in df.columns and 'MACD' in df.columns:
             df['RSI_MACD_interaction'] = df['RSI'] * df['MACD']
 
-        return df.fillna(0)
+        # Single terminal fill for NaNs from cleaning, indicator warm-up, lags and analysis
+        df.fillna(0, inplace=True)
+        return df
 
 # Example usage (for testing purposes)
 if __name__ == "__main__":
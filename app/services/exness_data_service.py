@@ -3,19 +3,48 @@ Exness Data Service for HOT SHARK Bot.
 Handles fetching real-time and historical market data from Exness via MetaTrader 5.
 """
 
+import asyncio
 import MetaTrader5 as mt5
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 import logging
+import time
 
 from sqlalchemy.orm import Session
-from app.models.market_data import MarketData
+from app.models.market_data import insert_market_data
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Standard symbols to Exness symbols
+SYMBOL_MAPPING = {
+    'XAUUSD': 'XAUUSD',
+    'EURUSD': 'EURUSD',
+    'GBPUSD': 'GBPUSD',
+    'USDJPY': 'USDJPY',
+    'GBPJPY': 'GBPJPY',
+    'BTCUSD': 'BTCUSD',
+    'ETHUSD': 'ETHUSD',
+    'US30': 'US30',
+    'US100': 'US100'
+}
+
+# Standard timeframe names to MT5 timeframe constants
+TIMEFRAME_MAPPING = {
+    "M1": mt5.TIMEFRAME_M1,
+    "M5": mt5.TIMEFRAME_M5,
+    "M15": mt5.TIMEFRAME_M15,
+    "M30": mt5.TIMEFRAME_M30,
+    "H1": mt5.TIMEFRAME_H1,
+    "H4": mt5.TIMEFRAME_H4,
+    "D1": mt5.TIMEFRAME_D1
+}
+
+# Symbol specifications change rarely, so cache them for a few minutes
+SYMBOL_INFO_TTL = 300
+
 class ExnessDataService:
     """Service for collecting market data from Exness via MetaTrader 5"""
     
@@ -27,28 +56,33 @@ class ExnessDataService:
         self.exness_server = getattr(Config, 'EXNESS_SERVER', 'Exness-MT5Trial')
         
         # Exness symbol mapping
-        self.symbol_mapping = {
-            'XAUUSD': 'XAUUSD',
-            'EURUSD': 'EURUSD',
-            'GBPUSD': 'GBPUSD', 
-            'USDJPY': 'USDJPY',
-            'GBPJPY': 'GBPJPY',
-            'BTCUSD': 'BTCUSD',
-            'ETHUSD': 'ETHUSD',
-            'US30': 'US30',
-            'US100': 'US100'
-        }
+        self.symbol_mapping = SYMBOL_MAPPING
+        
+        # symbol -> (fetched_at, info) for get_symbol_info
+        self._sym_info_cache: Dict[str, tuple] = {}
+        
+        # Serializes first-use initialization across concurrent calls
+        self._init_lock = asyncio.Lock()
+    
+    async def __aenter__(self):
+        await self._ensure_init()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.shutdown_mt5()
     
     async def initialize_mt5(self) -> bool:
         """Initialize MetaTrader 5 connection"""
         try:
-            if not mt5.initialize():
+            # MT5 calls block until the terminal answers, so run them off the event loop
+            if not await asyncio.to_thread(mt5.initialize):
                 logger.error("Failed to initialize MetaTrader 5")
                 return False
             
             # Login to Exness account if credentials provided
             if self.exness_login and self.exness_password:
-                authorized = mt5.login(
+                authorized = await asyncio.to_thread(
+                    mt5.login,
                     login=int(self.exness_login),
                     password=self.exness_password,
                     server=self.exness_server
@@ -67,6 +101,14 @@ class ExnessDataService:
             logger.error(f"Error initializing MT5: {e}")
             return False
     
+    async def _ensure_init(self):
+        """Initialize MT5 once; concurrent callers wait for the first attempt"""
+        if self.mt5_initialized:
+            return
+        async with self._init_lock:
+            if not self.mt5_initialized:
+                await self.initialize_mt5()
+    
     def shutdown_mt5(self):
         """Shutdown MetaTrader 5 connection"""
         if self.mt5_initialized:
@@ -80,30 +122,28 @@ class ExnessDataService:
     
     async def get_tick_data(self, symbol: str, count: int = 1000) -> List[Dict[str, Any]]:
         """Get latest tick data from Exness"""
-        if not self.mt5_initialized:
-            await self.initialize_mt5()
+        await self._ensure_init()
         
         exness_symbol = self.get_exness_symbol(symbol)
         
         try:
             # Get latest ticks
-            ticks = mt5.copy_ticks_from_pos(exness_symbol, 0, count)
+            ticks = await asyncio.to_thread(mt5.copy_ticks_from_pos, exness_symbol, 0, count)
             
             if ticks is None or len(ticks) == 0:
                 logger.warning(f"No tick data received for {exness_symbol}")
                 return []
             
-            tick_data = []
-            for tick in ticks:
-                tick_data.append({
-                    'symbol': symbol,
-                    'timestamp': datetime.fromtimestamp(tick.time),
-                    'bid': float(tick.bid),
-                    'ask': float(tick.ask),
-                    'last': float(tick.last),
-                    'volume': int(tick.volume),
-                    'flags': int(tick.flags)
-                })
+            # Convert the structured array column-wise instead of row by row
+            tick_data = pd.DataFrame({
+                'symbol': symbol,
+                'timestamp': pd.to_datetime(ticks['time'], unit='s', utc=True),
+                'bid': ticks['bid'].astype(np.float64),
+                'ask': ticks['ask'].astype(np.float64),
+                'last': ticks['last'].astype(np.float64),
+                'volume': ticks['volume'].astype(np.int64),
+                'flags': ticks['flags'].astype(np.int64)
+            }).to_dict('records')
             
             logger.info(f"Retrieved {len(tick_data)} ticks for {symbol} from Exness")
             return tick_data
@@ -112,70 +152,81 @@ class ExnessDataService:
             logger.error(f"Error getting tick data for {symbol}: {e}")
             return []
     
-    async def get_ohlcv_data(self, symbol: str, timeframe: str = "M1", count: int = 1000) -> List[Dict[str, Any]]:
-        """Get OHLCV data from Exness"""
-        if not self.mt5_initialized:
-            await self.initialize_mt5()
+    async def _copy_rates(self, symbol: str, timeframe: str, count: int) -> Optional[np.ndarray]:
+        """Fetch the latest bars for symbol as the MT5 structured rates array"""
+        await self._ensure_init()
         
         exness_symbol = self.get_exness_symbol(symbol)
         
         # Convert timeframe to MT5 format
-        timeframe_mapping = {
-            "M1": mt5.TIMEFRAME_M1,
-            "M5": mt5.TIMEFRAME_M5,
-            "M15": mt5.TIMEFRAME_M15,
-            "M30": mt5.TIMEFRAME_M30,
-            "H1": mt5.TIMEFRAME_H1,
-            "H4": mt5.TIMEFRAME_H4,
-            "D1": mt5.TIMEFRAME_D1
-        }
-        
-        mt5_timeframe = timeframe_mapping.get(timeframe, mt5.TIMEFRAME_M1)
+        mt5_timeframe = TIMEFRAME_MAPPING.get(timeframe, mt5.TIMEFRAME_M1)
         
         try:
             # Get rates data
-            rates = mt5.copy_rates_from_pos(exness_symbol, mt5_timeframe, 0, count)
+            rates = await asyncio.to_thread(mt5.copy_rates_from_pos, exness_symbol, mt5_timeframe, 0, count)
             
             if rates is None or len(rates) == 0:
                 logger.warning(f"No OHLCV data received for {exness_symbol}")
-                return []
+                return None
             
-            ohlcv_data = []
-            for rate in rates:
-                ohlcv_data.append({
-                    'symbol': symbol,
-                    'timestamp': datetime.fromtimestamp(rate['time']),
-                    'open': float(rate['open']),
-                    'high': float(rate['high']),
-                    'low': float(rate['low']),
-                    'close': float(rate['close']),
-                    'volume': int(rate['tick_volume']),
-                    'spread': int(rate['spread']),
-                    'timeframe': timeframe
-                })
-            
-            logger.info(f"Retrieved {len(ohlcv_data)} OHLCV bars for {symbol} from Exness")
-            return ohlcv_data
+            logger.info(f"Retrieved {len(rates)} OHLCV bars for {symbol} from Exness")
+            return rates
             
         except Exception as e:
             logger.error(f"Error getting OHLCV data for {symbol}: {e}")
+            return None
+    
+    async def get_ohlcv_columns(self, symbol: str, timeframe: str = "M1", count: int = 1000) -> Dict[str, Any]:
+        """Get OHLCV data from Exness as column arrays (empty when unavailable).
+        The arrays are sliced straight out of the MT5 rates, with no per-bar Python objects.
+        """
+        rates = await self._copy_rates(symbol, timeframe, count)
+        if rates is None:
+            return {}
+        
+        # MT5 times are epoch seconds, so bar-open timestamps are stored in UTC
+        return {
+            'timestamp': pd.to_datetime(rates['time'], unit='s', utc=True),
+            'open': rates['open'].astype(np.float64),
+            'high': rates['high'].astype(np.float64),
+            'low': rates['low'].astype(np.float64),
+            'close': rates['close'].astype(np.float64),
+            'volume': rates['tick_volume'].astype(np.int64),
+            'spread': rates['spread'].astype(np.int64)
+        }
+    
+    async def get_ohlcv_df(self, symbol: str, timeframe: str = "M1", count: int = 1000) -> Optional[pd.DataFrame]:
+        """Get OHLCV data from Exness as a DataFrame"""
+        columns = await self.get_ohlcv_columns(symbol, timeframe, count)
+        if not columns:
+            return None
+        return pd.DataFrame({'symbol': symbol, **columns, 'timeframe': timeframe})
+    
+    async def get_ohlcv_data(self, symbol: str, timeframe: str = "M1", count: int = 1000) -> List[Dict[str, Any]]:
+        """Get OHLCV data from Exness as a list of bar dicts"""
+        df = await self.get_ohlcv_df(symbol, timeframe, count)
+        if df is None:
             return []
+        return df.to_dict('records')
     
     async def get_symbol_info(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get symbol information from Exness"""
-        if not self.mt5_initialized:
-            await self.initialize_mt5()
+        cached = self._sym_info_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < SYMBOL_INFO_TTL:
+            return cached[1]
+        
+        await self._ensure_init()
         
         exness_symbol = self.get_exness_symbol(symbol)
         
         try:
-            symbol_info = mt5.symbol_info(exness_symbol)
+            symbol_info = await asyncio.to_thread(mt5.symbol_info, exness_symbol)
             
             if symbol_info is None:
                 logger.warning(f"No symbol info for {exness_symbol}")
                 return None
             
-            return {
+            info = {
                 'symbol': symbol,
                 'description': symbol_info.description,
                 'currency_base': symbol_info.currency_base,
@@ -192,6 +243,9 @@ class ExnessDataService:
                 'swap_short': symbol_info.swap_short
             }
             
+            self._sym_info_cache[symbol] = (time.monotonic(), info)
+            return info
+            
         except Exception as e:
             logger.error(f"Error getting symbol info for {symbol}: {e}")
             return None
@@ -200,58 +254,74 @@ class ExnessDataService:
         """Collect and store market data from Exness"""
         try:
             # Get OHLCV data
-            ohlcv_data = await self.get_ohlcv_data(symbol, timeframe, count)
+            df = await self.get_ohlcv_df(symbol, timeframe, count)
             
-            if not ohlcv_data:
+            if df is None or df.empty:
                 logger.warning(f"No data to store for {symbol}")
                 return
             
-            # Convert to MarketData objects
-            data_to_store = []
-            for data_point in ohlcv_data:
-                market_data = MarketData(
-                    symbol=symbol,
-                    timestamp=data_point['timestamp'],
-                    open_price=data_point['open'],
-                    high_price=data_point['high'],
-                    low_price=data_point['low'],
-                    close_price=data_point['close'],
-                    volume=data_point['volume'],
-                    interval=timeframe,
-                    source="Exness"
-                )
-                data_to_store.append(market_data)
+            # Insert mappings in one statement; the unique bar index drops duplicates
+            records = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].rename(columns={
+                'open': 'open_price',
+                'high': 'high_price',
+                'low': 'low_price',
+                'close': 'close_price'
+            }).assign(symbol=symbol, interval=timeframe, source="Exness").to_dict('records')
             
-            # Store in database
-            if data_to_store:
-                # Remove duplicates based on symbol and timestamp
-                existing_timestamps = set()
-                unique_data = []
-                
-                for data in data_to_store:
-                    timestamp_key = f"{data.symbol}_{data.timestamp}"
-                    if timestamp_key not in existing_timestamps:
-                        existing_timestamps.add(timestamp_key)
-                        unique_data.append(data)
-                
-                self.db.add_all(unique_data)
-                self.db.commit()
-                
-                logger.info(f"Successfully stored {len(unique_data)} data points for {symbol} from Exness")
+            insert_market_data(self.db, records)
+            self.db.commit()
+            
+            logger.info(f"Successfully stored {len(records)} data points for {symbol} from Exness")
             
         except Exception as e:
             logger.error(f"Error collecting and storing data for {symbol}: {e}")
             self.db.rollback()
     
+    async def collect_and_store_many(self, symbols: List[str], timeframe: str = "M1", count: int = 1000, max_concurrency: int = 4):
+        """Collect several symbols concurrently and store them in one insert"""
+        await self._ensure_init()
+        
+        sem = asyncio.Semaphore(max_concurrency)
+        
+        async def fetch(symbol: str) -> Optional[pd.DataFrame]:
+            async with sem:
+                return await self.get_ohlcv_df(symbol, timeframe, count)
+        
+        frames = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+        frames = [df for df in frames if df is not None and not df.empty]
+        
+        if not frames:
+            logger.warning(f"No data to store for {symbols}")
+            return
+        
+        try:
+            # The session is not safe for concurrent use, so only the fetches overlap
+            records = pd.concat(frames, ignore_index=True)[
+                ['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+            ].rename(columns={
+                'open': 'open_price',
+                'high': 'high_price',
+                'low': 'low_price',
+                'close': 'close_price'
+            }).assign(interval=timeframe, source="Exness").to_dict('records')
+            
+            insert_market_data(self.db, records)
+            self.db.commit()
+            
+            logger.info(f"Successfully stored {len(records)} data points for {len(frames)} symbols from Exness")
+        
+        except Exception as e:
+            logger.error(f"Error collecting and storing data for {symbols}: {e}")
+            self.db.rollback()
+    
     async def get_current_price(self, symbol: str) -> Optional[Dict[str, float]]:
         """Get current price for symbol from Exness"""
-        if not self.mt5_initialized:
-            await self.initialize_mt5()
+        await self._ensure_init()
         
         exness_symbol = self.get_exness_symbol(symbol)
         
         try:
-            tick = mt5.symbol_info_tick(exness_symbol)
+            tick = await asyncio.to_thread(mt5.symbol_info_tick, exness_symbol)
             
             if tick is None:
                 logger.warning(f"No current price for {exness_symbol}")
@@ -263,7 +333,7 @@ class ExnessDataService:
                 'ask': float(tick.ask),
                 'last': float(tick.last),
                 'spread': float(tick.ask - tick.bid),
-                'timestamp': datetime.fromtimestamp(tick.time)
+                'timestamp': datetime.fromtimestamp(tick.time, tz=timezone.utc)
             }
             
         except Exception as e:
@@ -272,14 +342,13 @@ class ExnessDataService:
     
     async def get_market_depth(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get market depth (DOM) data from Exness"""
-        if not self.mt5_initialized:
-            await self.initialize_mt5()
+        await self._ensure_init()
         
         exness_symbol = self.get_exness_symbol(symbol)
         
         try:
             # Get market book (depth of market)
-            book = mt5.market_book_get(exness_symbol)
+            book = await asyncio.to_thread(mt5.market_book_get, exness_symbol)
             
             if book is None:
                 logger.warning(f"No market depth for {exness_symbol}")
@@ -344,6 +413,5 @@ async def main():
         db.close()
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
 
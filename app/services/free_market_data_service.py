@@ -4,19 +4,56 @@ Uses multiple free sources without API keys
 Completely unlimited and free
 """
 
-import requests
-import pandas as pd
 import numpy as np
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 import time
 import logging
-import json
-import random
 from sqlalchemy.orm import Session
+from app.models.market_data import insert_market_data
+
+# pandas is only needed for intraday bars, so it is imported on first use
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True)
+class SymbolConfig:
+    """Simulation parameters for one symbol"""
+    base_price: float
+    volatility: float  # fraction of price; price units for gold, crypto and indices
+    spread: float
+    spread_abs: bool  # fixed spread instead of a fraction of the price
+    quote_volume: int  # typical volume for current price quotes
+    bar_volume: int  # typical volume per generated intraday bar
+    lo: float = field(init=False)
+    hi: float = field(init=False)
+    
+    def __post_init__(self):
+        # Prices stay within 5% of the base price
+        self.lo = self.base_price * 0.95
+        self.hi = self.base_price * 1.05
+
+SYMBOL_CONFIGS = {
+    'EURUSD': SymbolConfig(1.0850, 0.001, 0.0001, False, 1000000, 10000),  # 1 pip
+    'GBPUSD': SymbolConfig(1.2750, 0.0012, 0.0001, False, 800000, 10000),
+    'USDJPY': SymbolConfig(149.50, 0.008, 0.0001, False, 900000, 10000),
+    'GBPJPY': SymbolConfig(190.75, 0.015, 0.0002, False, 300000, 1000),  # 2 pips
+    'XAUUSD': SymbolConfig(2650.0, 2.5, 0.5, True, 50000, 10000),  # 50 cents
+    'BTCUSD': SymbolConfig(95000.0, 800.0, 0.0001, False, 100000, 100),
+    'ETHUSD': SymbolConfig(3400.0, 50.0, 0.0001, False, 200000, 100),
+    'US30': SymbolConfig(44500.0, 150.0, 0.0002, False, 500000, 10000),
+    'US100': SymbolConfig(19800.0, 80.0, 0.0002, False, 600000, 10000)
+}
+
+# Parameters for symbols without their own entry
+DEFAULT_SYMBOL_CONFIG = SymbolConfig(100.0, 0.01, 0.0002, False, 100000, 1000)
+
+# Sub-ticks simulated per generated intraday bar
+SUB_TICKS = 16
+
 class FreeMarketDataService:
     """
     Completely free market data service
@@ -26,63 +63,52 @@ class FreeMarketDataService:
     def __init__(self, db: Session):
         self.db = db
         
-        # Base prices for realistic simulation
-        self.base_prices = {
-            'EURUSD': 1.0850,
-            'GBPUSD': 1.2750,
-            'USDJPY': 149.50,
-            'GBPJPY': 190.75,
-            'XAUUSD': 2650.0,
-            'BTCUSD': 95000.0,
-            'ETHUSD': 3400.0,
-            'US30': 44500.0,
-            'US100': 19800.0
-        }
-        
-        # Price movement patterns
-        self.volatility = {
-            'EURUSD': 0.001,
-            'GBPUSD': 0.0012,
-            'USDJPY': 0.008,
-            'GBPJPY': 0.015,
-            'XAUUSD': 2.5,
-            'BTCUSD': 800.0,
-            'ETHUSD': 50.0,
-            'US30': 150.0,
-            'US100': 80.0
-        }
+        # Simulation parameters per symbol
+        self.symbols = SYMBOL_CONFIGS
         
         # Last prices for continuity
         self.last_prices = {}
         self.last_update = {}
         
+        # Session volatility multiplier, refreshed when the local hour changes
+        self._vol_mult = 1.0
+        self._vol_expiry = 0.0
+        
+        # Per-instance PCG64 generator for all draws (no global random state)
+        self.rng = np.random.default_rng()
+        
+    def _volatility_multiplier(self) -> float:
+        """Session volatility multiplier for the current local hour"""
+        now = time.time()
+        if now >= self._vol_expiry:
+            local = time.localtime(now)
+            current_hour = local.tm_hour
+            
+            # Higher volatility during market hours
+            if 8 <= current_hour <= 17:
+                self._vol_mult = 1.0
+            elif 17 <= current_hour <= 22:  # Evening session
+                self._vol_mult = 0.7
+            else:  # Night session
+                self._vol_mult = 0.3
+            
+            # Valid until the start of the next local hour
+            self._vol_expiry = now + 3600 - (local.tm_min * 60 + local.tm_sec)
+        
+        return self._vol_mult
+    
     def _generate_realistic_price(self, symbol: str) -> float:
         """Generate realistic price movement"""
-        base_price = self.base_prices.get(symbol, 100.0)
-        volatility = self.volatility.get(symbol, 0.01)
+        cfg = self.symbols.get(symbol, DEFAULT_SYMBOL_CONFIG)
         
         # Get last price or use base price
-        last_price = self.last_prices.get(symbol, base_price)
-        
-        # Time-based movement (simulate market hours effect)
-        current_hour = datetime.now().hour
-        
-        # Higher volatility during market hours
-        if 8 <= current_hour <= 17:
-            vol_multiplier = 1.0
-        elif 17 <= current_hour <= 22:  # Evening session
-            vol_multiplier = 0.7
-        else:  # Night session
-            vol_multiplier = 0.3
+        last_price = self.last_prices.get(symbol, cfg.base_price)
         
-        # Generate price movement
-        movement = random.gauss(0, volatility * vol_multiplier)
-        new_price = last_price * (1 + movement)
+        # Generate price movement (simulate market hours effect)
+        movement = self.rng.normal(0.0, cfg.volatility * self._volatility_multiplier())
         
         # Ensure price doesn't deviate too much from base
-        max_deviation = base_price * 0.05  # 5% max deviation
-        if abs(new_price - base_price) > max_deviation:
-            new_price = base_price + (max_deviation if new_price > base_price else -max_deviation)
+        new_price = min(cfg.hi, max(cfg.lo, last_price * (1 + movement)))
         
         # Update last price
         self.last_prices[symbol] = new_price
@@ -90,57 +116,47 @@ class FreeMarketDataService:
         
         return new_price
     
+    def _build_quote(self, symbol: str, current_price: float, volume: int, timestamp: datetime) -> Dict:
+        """Build a price quote with spread around the generated price"""
+        # Calculate spread
+        cfg = self.symbols.get(symbol, DEFAULT_SYMBOL_CONFIG)
+        spread = cfg.spread if cfg.spread_abs else current_price * cfg.spread
+        
+        bid = current_price - spread / 2
+        ask = current_price + spread / 2
+        
+        return {
+            'symbol': symbol,
+            'price': round(current_price, 5),
+            'bid': round(bid, 5),
+            'ask': round(ask, 5),
+            'last': round(current_price, 5),
+            'spread': round(spread, 5),
+            'volume': volume,
+            'timestamp': timestamp,
+            'source': 'Free Market Data'
+        }
+    
     def get_current_price(self, symbol: str) -> Optional[Dict]:
         """Get current price - completely free"""
         try:
             current_price = self._generate_realistic_price(symbol)
             
-            # Calculate spread
-            if 'USD' in symbol and symbol != 'XAUUSD':
-                spread = current_price * 0.0001  # 1 pip
-            elif symbol == 'XAUUSD':
-                spread = 0.5  # 50 cents
-            elif 'BTC' in symbol or 'ETH' in symbol:
-                spread = current_price * 0.001  # 0.1%
-            else:
-                spread = current_price * 0.0002  # 2 pips
-            
-            bid = current_price - spread / 2
-            ask = current_price + spread / 2
-            
             # Generate realistic volume
-            base_volume = {
-                'EURUSD': 1000000,
-                'GBPUSD': 800000,
-                'USDJPY': 900000,
-                'GBPJPY': 300000,
-                'XAUUSD': 50000,
-                'BTCUSD': 100000,
-                'ETHUSD': 200000,
-                'US30': 500000,
-                'US100': 600000
-            }.get(symbol, 100000)
+            base_volume = self.symbols.get(symbol, DEFAULT_SYMBOL_CONFIG).quote_volume
             
-            volume = int(base_volume * random.uniform(0.5, 1.5))
+            volume = int(base_volume * self.rng.uniform(0.5, 1.5))
             
-            return {
-                'symbol': symbol,
-                'price': round(current_price, 5),
-                'bid': round(bid, 5),
-                'ask': round(ask, 5),
-                'last': round(current_price, 5),
-                'spread': round(spread, 5),
-                'volume': volume,
-                'timestamp': datetime.now(),
-                'source': 'Free Market Data'
-            }
+            return self._build_quote(symbol, current_price, volume, datetime.now())
             
         except Exception as e:
             logger.error(f"Error generating price for {symbol}: {e}")
             return None
     
-    def get_intraday_data(self, symbol: str, interval: str = '5min') -> Optional[pd.DataFrame]:
+    def get_intraday_data(self, symbol: str, interval: str = '5min') -> Optional['pd.DataFrame']:
         """Generate realistic intraday data"""
+        import pandas as pd
+        
         try:
             # Generate data points
             interval_minutes = {
@@ -152,60 +168,41 @@ class FreeMarketDataService:
             }.get(interval, 5)
             
             # Generate 100 data points
-            data_points = []
-            current_time = datetime.now()
-            base_price = self.base_prices.get(symbol, 100.0)
-            volatility = self.volatility.get(symbol, 0.01)
+            n = 100
+            cfg = self.symbols.get(symbol, DEFAULT_SYMBOL_CONFIG)
+            base_price = cfg.base_price
+            volatility = cfg.volatility
+            
+            # Gold, crypto and indices quote volatility in price units; the bar
+            # model needs a fraction of the price or the path overflows float32
+            if volatility >= 1:
+                volatility /= base_price
             
-            # Start from base price
-            current_price = base_price
+            # Each bar is a path of sub-ticks relative to its open: the close is
+            # the last sub-tick and high/low are the path extremes (including the
+            # open), so bars are consistent without clamping the close.
+            # Bars chain open-to-previous-close, so the closes are one cumulative product.
+            path = np.cumprod(1 + self.rng.normal(0, volatility * 0.3 / np.sqrt(SUB_TICKS), (n, SUB_TICKS)), axis=1)
+            closes = base_price * np.cumprod(path[:, -1])
+            opens = np.concatenate(([base_price], closes[:-1]))
+            high_factor = np.maximum(path.max(axis=1), 1.0)
+            low_factor = np.minimum(path.min(axis=1), 1.0)
             
-            for i in range(100):
-                timestamp = current_time - timedelta(minutes=interval_minutes * (100 - i))
-                
-                # Generate OHLC data
-                # Open price (previous close or current)
-                open_price = current_price
-                
-                # Generate high and low
-                high_movement = random.uniform(0, volatility * 0.5)
-                low_movement = random.uniform(0, volatility * 0.5)
-                
-                high_price = open_price * (1 + high_movement)
-                low_price = open_price * (1 - low_movement)
-                
-                # Close price
-                close_movement = random.gauss(0, volatility * 0.3)
-                close_price = open_price * (1 + close_movement)
-                
-                # Ensure close is within high/low
-                close_price = max(low_price, min(high_price, close_price))
-                
-                # Generate volume
-                base_vol = 1000
-                if 'BTC' in symbol or 'ETH' in symbol:
-                    base_vol = 100
-                elif 'US' in symbol:
-                    base_vol = 10000
-                elif symbol == 'XAUUSD':
-                    base_vol = 500
-                
-                volume = int(base_vol * random.uniform(0.3, 2.0))
-                
-                data_points.append({
-                    'timestamp': timestamp,
-                    'open': round(open_price, 5),
-                    'high': round(high_price, 5),
-                    'low': round(low_price, 5),
-                    'close': round(close_price, 5),
-                    'volume': volume
-                })
-                
-                # Update current price for next iteration
-                current_price = close_price
+            # Generate volume
+            base_vol = cfg.bar_volume
             
-            df = pd.DataFrame(data_points)
-            df = df.sort_values('timestamp').reset_index(drop=True)
+            # date_range is already ascending, so no sort is needed.
+            # Bars are stored as float32/int32 to halve the memory traffic of
+            # rolling passes; indicator code that needs float64 should cast explicitly.
+            step = timedelta(minutes=interval_minutes)
+            df = pd.DataFrame({
+                'timestamp': pd.date_range(end=datetime.now() - step, periods=n, freq=step),
+                'open': np.round(opens, 5).astype(np.float32),
+                'high': np.round(opens * high_factor, 5).astype(np.float32),
+                'low': np.round(opens * low_factor, 5).astype(np.float32),
+                'close': np.round(closes, 5).astype(np.float32),
+                'volume': (base_vol * self.rng.uniform(0.3, 2.0, n)).astype(np.int32)
+            })
             
             logger.info(f"Generated {len(df)} realistic data points for {symbol}")
             return df
@@ -217,17 +214,36 @@ class FreeMarketDataService:
     def get_multiple_prices(self, symbols: List[str]) -> Dict[str, Dict]:
         """Get multiple prices efficiently"""
         results = {}
+        if not symbols:
+            return results
         
-        for symbol in symbols:
-            price_data = self.get_current_price(symbol)
-            if price_data:
-                results[symbol] = price_data
+        try:
+            # One draw for every symbol, same movement model as _generate_realistic_price
+            cfgs = [self.symbols.get(s, DEFAULT_SYMBOL_CONFIG) for s in symbols]
+            vols = np.array([c.volatility for c in cfgs])
+            last = np.array([self.last_prices.get(s, c.base_price) for s, c in zip(symbols, cfgs)])
+            lo = np.array([c.lo for c in cfgs])
+            hi = np.array([c.hi for c in cfgs])
+            
+            moves = self.rng.normal(0, vols * self._volatility_multiplier())
+            prices = np.clip(last * (1 + moves), lo, hi)
+            volumes = (np.array([c.quote_volume for c in cfgs])
+                       * self.rng.uniform(0.5, 1.5, len(symbols))).astype(np.int64)
+            
+            now = datetime.now()
+            for symbol, price, volume in zip(symbols, prices.tolist(), volumes.tolist()):
+                self.last_prices[symbol] = price
+                self.last_update[symbol] = now
+                results[symbol] = self._build_quote(symbol, price, volume, now)
+            
+        except Exception as e:
+            logger.error(f"Error generating prices for {symbols}: {e}")
         
         return results
     
     def get_supported_symbols(self) -> List[str]:
         """Get list of supported symbols"""
-        return list(self.base_prices.keys())
+        return list(self.symbols.keys())
     
     def test_connection(self) -> bool:
         """Test connection (always returns True)"""
@@ -314,35 +330,21 @@ class FreeMarketDataService:
         
         return events
     
-    def save_to_database(self, symbol: str, df: pd.DataFrame, timeframe: str):
+    def save_to_database(self, symbol: str, df: 'pd.DataFrame', timeframe: str):
         """Save data to database"""
         try:
-            for _, row in df.iterrows():
-                # Check if data already exists
-                existing = self.db.query(MarketData).filter(
-                    MarketData.symbol == symbol,
-                    MarketData.timeframe == timeframe,
-                    MarketData.timestamp == row['timestamp']
-                ).first()
-                
-                if not existing:
-                    market_data = MarketData(
-                        symbol=symbol,
-                        timeframe=timeframe,
-                        timestamp=row['timestamp'],
-                        open_price=row['open'],
-                        high_price=row['high'],
-                        low_price=row['low'],
-                        close_price=row['close'],
-                        volume=row['volume'],
-                        source='Free Market Data'
-                    )
-                    self.db.add(market_data)
+            # Insert mappings in one statement; the unique bar index drops duplicates
+            records = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].rename(columns={
+                'open': 'open_price',
+                'high': 'high_price',
+                'low': 'low_price',
+                'close': 'close_price'
+            }).assign(symbol=symbol, interval=timeframe, source='Free Market Data').to_dict('records')
             
+            insert_market_data(self.db, records)
             self.db.commit()
             logger.info(f"Saved {len(df)} data points for {symbol}")
             
         except Exception as e:
             logger.error(f"Error saving data: {e}")
             self.db.rollback()
-
@@ -8,257 +8,454 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
+import heapq
 import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from numba import njit
 
 from app.services.advanced_analysis_service import AdvancedAnalysisService
 
 logger = logging.getLogger(__name__)
 
+# JIT-compiled rolling reducers (pandas numba engine); nogil lets symbols run in threads
+_NUMBA_ROLLING_KWARGS = {'nopython': True, 'nogil': True}
+
+# Columns exposed in the comprehensive_ict_analysis records
+_PUBLIC_COLUMNS = [
+    'timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+    'ob_strength', 'liquidity_type', 'liquidity_strength',
+    'fvg_type', 'fvg_top', 'fvg_bottom', 'fvg_strength',
+    'bos_type', 'bos_strength'
+]
+
+
+def _float32_columns(df: pd.DataFrame, *names: str):
+    """OHLCV columns as contiguous float32 arrays (one per name); the analysis only
+    compares and takes ratios of prices, so float32 halves memory traffic at no cost"""
+    return tuple(df[name].to_numpy(dtype=np.float32) for name in names)
+
+
+def _prefix_sums(values: np.ndarray):
+    """Prefix sums and counts of the non-NaN values, for O(1) window means.
+    Sums accumulate in float64 even for float32 input."""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0), dtype=np.float64)))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    return sums, counts
+
+
+def _window_means(prefix, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+    """NaN-skipping mean of values[start:stop] per element (NaN where a window has no values)"""
+    sums, counts = prefix
+    n = counts[stop] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[stop] - sums[start]) / n, np.nan)
+
+
+@njit(cache=True, nogil=True, error_model="numpy")
+def _fvg_kernel(high, low, surge_factor):
+    """Fused three-candle scan behind identify_fair_value_gaps.
+    Each bar's predicates and strength are evaluated in a single loop without temporaries.
+    Returns (type_code, fvg_strength, fvg_top, fvg_bottom); type_code indexes _DIRECTION_TYPES.
+    """
+    n = high.shape[0]
+    type_code = np.zeros(n, dtype=np.int8)
+    strength = np.zeros(n, dtype=np.float64)
+    top = np.zeros(n, dtype=np.float64)
+    bottom = np.zeros(n, dtype=np.float64)
+    for i in range(2, n):
+        current_high = high[i]
+        current_low = low[i]
+        # Bearish FVG: Gap between candle[i-2].high and candle[i].low, with candle[i-1] not filling it
+        if high[i-2] < current_low and high[i-1] < current_low and low[i-1] < current_low:
+            type_code[i] = 2
+            strength[i] = min(100.0, (current_low - high[i-2]) / high[i-2] * 1000.0 * surge_factor[i])
+            top[i] = current_low
+            bottom[i] = high[i-2]
+        # Bullish FVG: Gap between candle[i-2].low and candle[i].high, with candle[i-1] not filling it
+        elif low[i-2] > current_high and low[i-1] > current_high and high[i-1] > current_high:
+            type_code[i] = 1
+            strength[i] = min(100.0, (low[i-2] - current_high) / current_high * 1000.0 * surge_factor[i])
+            top[i] = low[i-2]
+            bottom[i] = current_high
+    return type_code, strength, top, bottom
+
+@njit(cache=True, nogil=True)
+def _bos_kernel(high, low, close, volume, avg_volumes, lookback):
+    """Bar scan behind identify_break_of_structure; returns (type_code, bos_strength).
+    The swing level for bar i is the extreme of the centred lookback-bar rolling max/min
+    over bars [i-2*lookback, i-lookback), i.e. a plain max/min over the union of those
+    windows, skipping labels whose window would run off the start of the series.
+    """
+    n = close.shape[0]
+    type_code = np.zeros(n, dtype=np.int8)
+    strength = np.zeros(n, dtype=np.float64)
+    left = lookback // 2
+    right = lookback - 1 - left
+    for i in range(lookback * 2, n):
+        lo = max(i - lookback * 2, left)
+        hi = i - lookback
+        if lo >= hi:
+            continue
+
+        highest_swing = -np.inf
+        lowest_swing = np.inf
+        found = False
+        for k in range(lo - left, hi + right):
+            if not np.isnan(high[k]) and not np.isnan(low[k]):
+                highest_swing = max(highest_swing, high[k])
+                lowest_swing = min(lowest_swing, low[k])
+                found = True
+        if not found:
+            continue
+
+        current_close = close[i]
+        current_volume = volume[i]
+        avg_volume = avg_volumes[i]
+        volume_strength = current_volume / avg_volume if avg_volume > 0 else 1.0
+
+        # Bullish break of the recent swing high, with volume confirmation
+        if current_close > highest_swing and current_volume > avg_volume * 1.3:
+            type_code[i] = 1
+            price_strength = (current_close - highest_swing) / highest_swing
+            strength[i] = min(100.0, price_strength * volume_strength * 100)
+
+        # Bearish break of the recent swing low, with volume confirmation
+        if current_close < lowest_swing and current_volume > avg_volume * 1.3:
+            type_code[i] = 2
+            price_strength = (lowest_swing - current_close) / lowest_swing
+            strength[i] = min(100.0, price_strength * volume_strength * 100)
+    return type_code, strength
+
+
+# fvg_type / bos_type labels by kernel type code
+_DIRECTION_TYPES = np.array(["", "bullish", "bearish"], dtype=object)
+
+# Tick index for prices that cannot be placed on the grid (NaN or no usable tick size);
+# half the int64 range so tick differences against it cannot overflow
+_NO_TICK = np.iinfo(np.int64).min // 2
+
+
+def _tick_quantize(values: np.ndarray, tick: float) -> np.ndarray:
+    """Prices as integer multiples of tick (floored), with _NO_TICK for anything unplaceable"""
+    ticks = np.full(values.shape[0], _NO_TICK, dtype=np.int64)
+    if np.isfinite(tick) and tick > 0:
+        valid = np.isfinite(values)
+        ticks[valid] = np.floor(values[valid].astype(np.float64) / tick).astype(np.int64)
+    return ticks
+
+
+# liquidity_type categories by kernel type code
+_LIQUIDITY_TYPES = ["", "resistance", "support", "equal_highs", "equal_lows"]
+
+
+@njit(cache=True, nogil=True)
+def _liquidity_kernel(high, low, volume, volume_sums, volume_counts, swing_high, swing_low, window,
+                      range_percent, high_ticks, low_ticks):
+    """Bar scan behind identify_liquidity_zones; returns (is_liquidity_zone, type_code, liquidity_strength).
+    Type codes index _LIQUIDITY_TYPES. Later checks override earlier ones on the same bar.
+    volume_sums/volume_counts are the _prefix_sums of volume, so window means cost O(1).
+    high_ticks/low_ticks are the prices on the _tick_quantize grid. The tick is at least every
+    bar's tolerance, so equal levels are at most one tick apart; the grid only pre-filters and the
+    float tolerance check still decides.
+    Serial on purpose: analyze_many runs kernels from several threads, which numba's
+    workqueue threading layer cannot host; parallelism comes from nogil + the executor.
+    """
+    n = high.shape[0]
+    is_zone = np.zeros(n, dtype=np.bool_)
+    type_code = np.zeros(n, dtype=np.int8)
+    strength = np.zeros(n, dtype=np.float64)
+
+    for i in range(window, n - window):
+        current_high = high[i]
+        current_low = low[i]
+        current_volume = volume[i]
+
+        # NaN-skipping mean volume around the bar
+        count = volume_counts[i + window] - volume_counts[i - window]
+        avg_volume = (volume_sums[i + window] - volume_sums[i - window]) / count if count > 0 else np.nan
+
+        # Check for swing high with volume
+        if current_high == swing_high[i] and current_volume > avg_volume * 1.5:
+            is_zone[i] = True
+            type_code[i] = 1
+            strength[i] = min(100.0, (current_volume / avg_volume) * 20)
+
+        # Check for swing low with volume
+        if current_low == swing_low[i] and current_volume > avg_volume * 1.5:
+            is_zone[i] = True
+            type_code[i] = 2
+            strength[i] = min(100.0, (current_volume / avg_volume) * 20)
+
+        # Check for equal highs/lows (potential stop run areas) in the previous 20 bars:
+        # neighbouring ticks pre-filter, the tolerance band (always float64) confirms
+        tolerance = np.float64(current_high) * range_percent
+        high_tick = high_ticks[i]
+        low_tick = low_ticks[i]
+        equal_highs = 0
+        equal_lows = 0
+        for k in range(max(0, i - 20), i):
+            if abs(high_ticks[k] - high_tick) <= 1:
+                equal_highs += current_high - tolerance <= high[k] <= current_high + tolerance
+            if abs(low_ticks[k] - low_tick) <= 1:
+                equal_lows += current_low - tolerance <= low[k] <= current_low + tolerance
+        if high_tick == _NO_TICK:
+            equal_highs = 0
+        if low_tick == _NO_TICK:
+            equal_lows = 0
+
+        if equal_highs >= 2:
+            is_zone[i] = True
+            type_code[i] = 3
+            strength[i] = min(100.0, equal_highs * 25.0)
+
+        if equal_lows >= 2:
+            is_zone[i] = True
+            type_code[i] = 4
+            strength[i] = min(100.0, equal_lows * 25.0)
+
+    return is_zone, type_code, strength
+
+
+def _order_block_columns(open_p, close_p, volume_prefix, lookback_period):
+    """Order block columns for identify_order_blocks, from raw price arrays and the volume _prefix_sums"""
+    n = close_p.shape[0]
+
+    bullish = np.zeros(n, dtype=bool)
+    bearish = np.zeros(n, dtype=bool)
+    strength = np.zeros(n, dtype=np.float64)
+
+    # Bar i-1 is the candidate block, judged against the lookback bars either side of it
+    i = np.arange(lookback_period, n)
+    if len(i):
+        ahead = np.minimum(i + lookback_period, n)
+        future_close_avg = _window_means(_prefix_sums(close_p), i, ahead)
+        volume_avg = _window_means(volume_prefix, i, ahead)
+        prev_volume_avg = _window_means(volume_prefix, i - lookback_period, i)
+
+        prev_open = open_p[i-1]
+        prev_close = close_p[i-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            volume_strength = np.where(prev_volume_avg > 0, volume_avg / prev_volume_avg, 1.0)
+        volume_confirmed = volume_avg > prev_volume_avg * 1.2
+
+        # Bullish Order Block: last down candle before an impulsive move up with volume
+        bull = (prev_close < prev_open) & (future_close_avg > prev_open * 1.005) & volume_confirmed
+        # Bearish Order Block: last up candle before an impulsive move down with volume
+        bear = (prev_close > prev_open) & (future_close_avg < prev_open * 0.995) & volume_confirmed
+
+        price_strength = np.where(bull, future_close_avg - prev_open, prev_open - future_close_avg) / prev_open
+        bullish[i-1] = bull
+        bearish[i-1] = bear
+        strength[i-1] = np.where(bull | bear, np.minimum(100.0, price_strength * volume_strength * 1000), 0.0)
+
+    return {
+        "is_bullish_ob": bullish,
+        "is_bearish_ob": bearish,
+        "ob_strength": strength
+    }
+
+
+def _liquidity_columns(high, low, volume, volume_prefix, range_percent, window=5):
+    """Liquidity zone columns for identify_liquidity_zones; the swing levels stay internal"""
+    # Identify swing highs/lows with volume analysis
+    swing_high = pd.Series(high).rolling(window=window, center=True).max(
+        engine='numba', engine_kwargs=_NUMBA_ROLLING_KWARGS).to_numpy()
+    swing_low = pd.Series(low).rolling(window=window, center=True).min(
+        engine='numba', engine_kwargs=_NUMBA_ROLLING_KWARGS).to_numpy()
+
+    # Equal-level grid: one tick covers the widest tolerance (range_percent of the highest
+    # high), padded so float rounding never pushes a match two ticks away
+    finite_high = high[np.isfinite(high)]
+    tick = float(finite_high.max()) * range_percent * 1.001 if len(finite_high) else np.nan
+
+    # Enhanced liquidity zone identification
+    volume_sums, volume_counts = volume_prefix
+    is_zone, type_code, zone_strength = _liquidity_kernel(
+        high, low, volume, volume_sums, volume_counts, swing_high, swing_low, window,
+        range_percent, _tick_quantize(high, tick), _tick_quantize(low, tick)
+    )
+    return {
+        "is_liquidity_zone": is_zone,
+        "liquidity_type": pd.Categorical.from_codes(type_code, categories=_LIQUIDITY_TYPES),
+        "liquidity_strength": zone_strength
+    }
+
+
+def _fvg_columns(high, low, volume, volume_prefix):
+    """Fair value gap columns for identify_fair_value_gaps, from raw price arrays and the volume _prefix_sums"""
+    n = high.shape[0]
+
+    # Volume analysis for FVG strength: surge over the mean of the previous 5 bars
+    surge_factor = np.ones(n, dtype=np.float64)
+    if n > 2:
+        i = np.arange(2, n)
+        prev_volume_avg = _window_means(volume_prefix, np.maximum(i - 5, 0), i)
+        volume_surge = (i >= 5) & (volume[2:] > prev_volume_avg * 1.5)
+        surge_factor[2:] = np.where(volume_surge, 1.5, 1.0)
+
+    # Strength based on gap size and volume
+    type_code, fvg_strength, fvg_top, fvg_bottom = _fvg_kernel(high, low, surge_factor)
+
+    return {
+        "is_fvg": type_code != 0,
+        "fvg_type": _DIRECTION_TYPES[type_code],
+        "fvg_strength": fvg_strength,
+        "fvg_top": fvg_top,
+        "fvg_bottom": fvg_bottom,
+        # Direction flags used as ML features, derived from the same scan
+        "is_bullish_fvg": type_code == 1,
+        "is_bearish_fvg": type_code == 2
+    }
+
+
+def _assign_columns(df: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Write computed columns onto df in place"""
+    for name, values in columns.items():
+        df[name] = values
+    return df
+
+
 class ICTSMCAnalyzerService:
     def __init__(self, db_session=None):
         self.advanced_analysis = AdvancedAnalysisService(db_session) if db_session else None
+        
+        # (symbol, timeframe, periods) -> (minute bucket, analysis); entries expire with the bucket
+        self._analysis_cache: Dict[tuple, tuple] = {}
 
     def identify_order_blocks(self, df: pd.DataFrame, lookback_period: int = 5) -> pd.DataFrame:
         """Identifies potential bullish and bearish order blocks.
         Enhanced with volume analysis for better accuracy.
         """
-        df["is_bullish_ob"] = False
-        df["is_bearish_ob"] = False
-        df["ob_strength"] = 0.0
-
-        for i in range(lookback_period, len(df)):
-            # Bullish Order Block: Last down candle before an impulsive move up
-            if df["close_price"].iloc[i-1] < df["open_price"].iloc[i-1]: # Previous candle is bearish
-                # Check for strong move up with volume confirmation
-                future_close_avg = df["close_price"].iloc[i:i+lookback_period].mean()
-                volume_avg = df["volume"].iloc[i:i+lookback_period].mean()
-                prev_volume_avg = df["volume"].iloc[i-lookback_period:i].mean()
-                
-                if (future_close_avg > df["open_price"].iloc[i-1] * 1.005 and 
-                    volume_avg > prev_volume_avg * 1.2): # Volume confirmation
-                    df.loc[df.index[i-1], "is_bullish_ob"] = True
-                    # Calculate strength based on price move and volume
-                    price_strength = (future_close_avg - df["open_price"].iloc[i-1]) / df["open_price"].iloc[i-1]
-                    volume_strength = volume_avg / prev_volume_avg if prev_volume_avg > 0 else 1
-                    df.loc[df.index[i-1], "ob_strength"] = min(100, price_strength * volume_strength * 1000)
-            
-            # Bearish Order Block: Last up candle before an impulsive move down
-            if df["close_price"].iloc[i-1] > df["open_price"].iloc[i-1]: # Previous candle is bullish
-                # Check for strong move down with volume confirmation
-                future_close_avg = df["close_price"].iloc[i:i+lookback_period].mean()
-                volume_avg = df["volume"].iloc[i:i+lookback_period].mean()
-                prev_volume_avg = df["volume"].iloc[i-lookback_period:i].mean()
-                
-                if (future_close_avg < df["open_price"].iloc[i-1] * 0.995 and 
-                    volume_avg > prev_volume_avg * 1.2): # Volume confirmation
-                    df.loc[df.index[i-1], "is_bearish_ob"] = True
-                    # Calculate strength based on price move and volume
-                    price_strength = (df["open_price"].iloc[i-1] - future_close_avg) / df["open_price"].iloc[i-1]
-                    volume_strength = volume_avg / prev_volume_avg if prev_volume_avg > 0 else 1
-                    df.loc[df.index[i-1], "ob_strength"] = min(100, price_strength * volume_strength * 1000)
-        
-        return df
+        open_p, close_p, volume = _float32_columns(df, "open_price", "close_price", "volume")
+        return _assign_columns(df, _order_block_columns(open_p, close_p, _prefix_sums(volume), lookback_period))
 
     def identify_liquidity_zones(self, df: pd.DataFrame, range_percent: float = 0.001) -> pd.DataFrame:
         """Identifies potential liquidity zones with enhanced stop run detection.
         """
-        df["is_liquidity_zone"] = False
-        df["liquidity_type"] = ""
-        df["liquidity_strength"] = 0.0
-        
-        # Identify swing highs/lows with volume analysis
-        window = 5
-        df["swing_high"] = df["high_price"].rolling(window=window, center=True).max()
-        df["swing_low"] = df["low_price"].rolling(window=window, center=True).min()
-        df["volume_at_swing"] = df["volume"].rolling(window=window, center=True).mean()
-
-        # Enhanced liquidity zone identification
-        for i in range(window, len(df) - window):
-            current_high = df["high_price"].iloc[i]
-            current_low = df["low_price"].iloc[i]
-            current_volume = df["volume"].iloc[i]
-            avg_volume = df["volume"].iloc[i-window:i+window].mean()
-            
-            # Check for swing high with volume
-            if (current_high == df["swing_high"].iloc[i] and 
-                current_volume > avg_volume * 1.5):
-                df.loc[df.index[i], "is_liquidity_zone"] = True
-                df.loc[df.index[i], "liquidity_type"] = "resistance"
-                df.loc[df.index[i], "liquidity_strength"] = min(100, (current_volume / avg_volume) * 20)
-            
-            # Check for swing low with volume
-            if (current_low == df["swing_low"].iloc[i] and 
-                current_volume > avg_volume * 1.5):
-                df.loc[df.index[i], "is_liquidity_zone"] = True
-                df.loc[df.index[i], "liquidity_type"] = "support"
-                df.loc[df.index[i], "liquidity_strength"] = min(100, (current_volume / avg_volume) * 20)
-            
-            # Check for equal highs/lows (potential stop run areas)
-            tolerance = current_high * range_percent
-            
-            # Look for equal highs in recent data
-            recent_highs = df["high_price"].iloc[max(0, i-20):i]
-            equal_highs = recent_highs[(recent_highs >= current_high - tolerance) & 
-                                     (recent_highs <= current_high + tolerance)]
-            
-            if len(equal_highs) >= 2:
-                df.loc[df.index[i], "is_liquidity_zone"] = True
-                df.loc[df.index[i], "liquidity_type"] = "equal_highs"
-                df.loc[df.index[i], "liquidity_strength"] = min(100, len(equal_highs) * 25)
-            
-            # Look for equal lows in recent data
-            recent_lows = df["low_price"].iloc[max(0, i-20):i]
-            equal_lows = recent_lows[(recent_lows >= current_low - tolerance) & 
-                                   (recent_lows <= current_low + tolerance)]
-            
-            if len(equal_lows) >= 2:
-                df.loc[df.index[i], "is_liquidity_zone"] = True
-                df.loc[df.index[i], "liquidity_type"] = "equal_lows"
-                df.loc[df.index[i], "liquidity_strength"] = min(100, len(equal_lows) * 25)
-        
-        return df
+        high, low, volume = _float32_columns(df, "high_price", "low_price", "volume")
+        return _assign_columns(df, _liquidity_columns(high, low, volume, _prefix_sums(volume), range_percent))
 
     def identify_fair_value_gaps(self, df: pd.DataFrame) -> pd.DataFrame:
         """Identifies Fair Value Gaps (FVG) with enhanced volume analysis.
         """
-        df["is_fvg"] = False
-        df["fvg_type"] = ""
-        df["fvg_strength"] = 0.0
-        df["fvg_top"] = 0.0
-        df["fvg_bottom"] = 0.0
-
-        for i in range(2, len(df)):
-            # Bullish FVG: Gap between candle[i-2].low and candle[i].high, with candle[i-1] not filling it
-            prev2_low = df["low_price"].iloc[i-2]
-            current_high = df["high_price"].iloc[i]
-            prev1_low = df["low_price"].iloc[i-1]
-            prev1_high = df["high_price"].iloc[i-1]
-            
-            # Volume analysis for FVG strength
-            volume_surge = df["volume"].iloc[i] > df["volume"].iloc[i-5:i].mean() * 1.5
-            
-            # Bullish FVG
-            if (prev2_low > current_high and 
-                prev1_low > current_high and 
-                prev1_high > current_high):
-                df.loc[df.index[i], "is_fvg"] = True
-                df.loc[df.index[i], "fvg_type"] = "bullish"
-                df.loc[df.index[i], "fvg_top"] = prev2_low
-                df.loc[df.index[i], "fvg_bottom"] = current_high
-                
-                # Calculate strength based on gap size and volume
-                gap_size = (prev2_low - current_high) / current_high
-                strength = gap_size * 1000
-                if volume_surge:
-                    strength *= 1.5
-                df.loc[df.index[i], "fvg_strength"] = min(100, strength)
-
-            # Bearish FVG: Gap between candle[i-2].high and candle[i].low, with candle[i-1] not filling it
-            prev2_high = df["high_price"].iloc[i-2]
-            current_low = df["low_price"].iloc[i]
-            
-            if (prev2_high < current_low and 
-                prev1_high < current_low and 
-                prev1_low < current_low):
-                df.loc[df.index[i], "is_fvg"] = True
-                df.loc[df.index[i], "fvg_type"] = "bearish"
-                df.loc[df.index[i], "fvg_top"] = current_low
-                df.loc[df.index[i], "fvg_bottom"] = prev2_high
-                
-                # Calculate strength based on gap size and volume
-                gap_size = (current_low - prev2_high) / prev2_high
-                strength = gap_size * 1000
-                if volume_surge:
-                    strength *= 1.5
-                df.loc[df.index[i], "fvg_strength"] = min(100, strength)
+        high, low, volume = _float32_columns(df, "high_price", "low_price", "volume")
+        return _assign_columns(df, _fvg_columns(high, low, volume, _prefix_sums(volume)))
 
-        return df
+    @staticmethod
+    def _analyze_all(open_p, high_p, low_p, close_p, volume) -> Dict[str, np.ndarray]:
+        """Order block, liquidity and FVG columns in one pass over shared arrays.
+        The volume prefix sums are built once and reused by all three.
+        """
+        volume_prefix = _prefix_sums(volume)
+        columns = _order_block_columns(open_p, close_p, volume_prefix, 5)
+        columns.update(_liquidity_columns(high_p, low_p, volume, volume_prefix, 0.001))
+        columns.update(_fvg_columns(high_p, low_p, volume, volume_prefix))
+        return columns
 
     def identify_break_of_structure(self, df: pd.DataFrame, lookback: int = 10) -> pd.DataFrame:
         """Identifies Break of Structure (BOS) with volume confirmation.
         """
-        df["is_bos"] = False
-        df["bos_type"] = ""
-        df["bos_strength"] = 0.0
-
-        # Calculate swing highs and lows
-        df["swing_high"] = df["high_price"].rolling(window=lookback, center=True).max()
-        df["swing_low"] = df["low_price"].rolling(window=lookback, center=True).min()
-
-        for i in range(lookback * 2, len(df)):
-            current_close = df["close_price"].iloc[i]
-            current_volume = df["volume"].iloc[i]
-            avg_volume = df["volume"].iloc[i-lookback:i].mean()
-            
-            # Look for recent swing high to break
-            recent_swing_highs = df["swing_high"].iloc[i-lookback*2:i-lookback]
-            recent_swing_highs = recent_swing_highs.dropna()
-            
-            if len(recent_swing_highs) > 0:
-                highest_swing = recent_swing_highs.max()
-                if (current_close > highest_swing and 
-                    current_volume > avg_volume * 1.3):  # Volume confirmation
-                    df.loc[df.index[i], "is_bos"] = True
-                    df.loc[df.index[i], "bos_type"] = "bullish"
-                    
-                    # Calculate strength
-                    price_strength = (current_close - highest_swing) / highest_swing
-                    volume_strength = current_volume / avg_volume if avg_volume > 0 else 1
-                    df.loc[df.index[i], "bos_strength"] = min(100, price_strength * volume_strength * 100)
-
-            # Look for recent swing low to break
-            recent_swing_lows = df["swing_low"].iloc[i-lookback*2:i-lookback]
-            recent_swing_lows = recent_swing_lows.dropna()
-            
-            if len(recent_swing_lows) > 0:
-                lowest_swing = recent_swing_lows.min()
-                if (current_close < lowest_swing and 
-                    current_volume > avg_volume * 1.3):  # Volume confirmation
-                    df.loc[df.index[i], "is_bos"] = True
-                    df.loc[df.index[i], "bos_type"] = "bearish"
-                    
-                    # Calculate strength
-                    price_strength = (lowest_swing - current_close) / lowest_swing
-                    volume_strength = current_volume / avg_volume if avg_volume > 0 else 1
-                    df.loc[df.index[i], "bos_strength"] = min(100, price_strength * volume_strength * 100)
+        n = len(df)
+        high, low, close, volume = _float32_columns(df, "high_price", "low_price", "close_price", "volume")
+        
+        # Mean volume of the lookback bars before each bar, from one running sum
+        i = np.arange(n)
+        avg_volumes = _window_means(_prefix_sums(volume), np.maximum(i - lookback, 0), i)
+        
+        type_code, bos_strength = _bos_kernel(high, low, close, volume, avg_volumes, lookback)
+
+        df["is_bos"] = type_code != 0
+        df["bos_type"] = _DIRECTION_TYPES[type_code]
+        df["bos_strength"] = bos_strength
 
         return df
 
-    async def comprehensive_ict_analysis(self, symbol: str, timeframe: str = "M5", periods: int = 100) -> Dict[str, Any]:
+    def _analyze_ohlcv(self, ohlcv_data: Dict[str, Any]) -> pd.DataFrame:
+        """Synchronous ICT/SMC pass over OHLCV column arrays; the kernels release the GIL,
+        so this can run in a worker thread.
+        """
+        # Convert to DataFrame (column arrays are adopted without a row-wise pass)
+        df = pd.DataFrame(ohlcv_data, copy=False)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, cache=True)
+        # Bars normally arrive in ascending order; only sort when they don't
+        if not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values('timestamp', kind='mergesort', ignore_index=True)
+        
+        # Rename columns for compatibility
+        df = df.rename(columns={
+            'open': 'open_price',
+            'high': 'high_price', 
+            'low': 'low_price',
+            'close': 'close_price'
+        })
+        
+        # Apply ICT/SMC analysis
+        df = self.identify_order_blocks(df)
+        df = self.identify_liquidity_zones(df)
+        df = self.identify_fair_value_gaps(df)
+        return self.identify_break_of_structure(df)
+
+    async def analyze_many(self, symbols: List[str], timeframe: str = "M5", periods: int = 100) -> Dict[str, Dict[str, Any]]:
+        """Run comprehensive_ict_analysis for several symbols concurrently.
+        The CPU-bound part of each symbol runs in a shared thread pool.
+        """
+        if not symbols:
+            return {}
+        
+        with ThreadPoolExecutor(max_workers=min(len(symbols), os.cpu_count() or 1)) as executor:
+            results = await asyncio.gather(*(
+                self.comprehensive_ict_analysis(symbol, timeframe, periods, executor=executor)
+                for symbol in symbols
+            ))
+        return dict(zip(symbols, results))
+
+    async def comprehensive_ict_analysis(self, symbol: str, timeframe: str = "M5", periods: int = 100,
+                                         executor: Optional[Executor] = None) -> Dict[str, Any]:
         """Perform comprehensive ICT/SMC analysis with advanced indicators.
+        When an executor is given, the ICT/SMC pass runs on it instead of the event loop.
+        Results are cached per minute; callers get a shallow copy and must not mutate nested sections.
         """
         try:
             if not self.advanced_analysis:
                 logger.warning("Advanced analysis service not available")
                 return {"error": "Advanced analysis service not initialized"}
             
-            # Get market data
-            ohlcv_data = await self.advanced_analysis.exness_service.get_ohlcv_data(symbol, timeframe, periods)
+            key = (symbol, timeframe, periods)
+            minute = int(time.time() // 60)
+            cached = self._analysis_cache.get(key)
+            if cached and cached[0] == minute:
+                return dict(cached[1])
+            
+            # Fetch market data and advanced analysis concurrently
+            ohlcv_task = asyncio.create_task(
+                self.advanced_analysis.exness_service.get_ohlcv_columns(symbol, timeframe, periods)
+            )
+            adv_task = asyncio.create_task(
+                self.advanced_analysis.get_comprehensive_analysis(symbol, timeframe, periods)
+            )
+            ohlcv_data, advanced_analysis = await asyncio.gather(ohlcv_task, adv_task)
             
             if not ohlcv_data:
                 return {"error": f"No market data available for {symbol}"}
             
-            # Convert to DataFrame
-            df = pd.DataFrame(ohlcv_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
-            
-            # Rename columns for compatibility
-            df = df.rename(columns={
-                'open': 'open_price',
-                'high': 'high_price', 
-                'low': 'low_price',
-                'close': 'close_price'
-            })
-            
-            # Apply ICT/SMC analysis
-            df = self.identify_order_blocks(df)
-            df = self.identify_liquidity_zones(df)
-            df = self.identify_fair_value_gaps(df)
-            df = self.identify_break_of_structure(df)
-            
-            # Get advanced analysis
-            advanced_analysis = await self.advanced_analysis.get_comprehensive_analysis(symbol, timeframe, periods)
+            if executor is not None:
+                df = await asyncio.get_running_loop().run_in_executor(executor, self._analyze_ohlcv, ohlcv_data)
+            else:
+                df = self._analyze_ohlcv(ohlcv_data)
+            
+            # Masks are computed once; records carry only the public columns
+            public = df[_PUBLIC_COLUMNS]
+            bullish_ob = df['is_bullish_ob'].to_numpy()
+            bearish_ob = df['is_bearish_ob'].to_numpy()
+            liquidity_type = df['liquidity_type'].array  # Categorical: comparisons run on the int8 codes
+            fvg_type = df['fvg_type'].to_numpy()
+            bos_type = df['bos_type'].to_numpy()
+            high = df['high_price'].to_numpy()
+            low = df['low_price'].to_numpy()
             
             # Combine results
             ict_analysis = {
@@ -266,26 +463,26 @@ class ICTSMCAnalyzerService:
                 'timeframe': timeframe,
                 'timestamp': datetime.now(),
                 'order_blocks': {
-                    'bullish': df[df['is_bullish_ob']].to_dict('records'),
-                    'bearish': df[df['is_bearish_ob']].to_dict('records'),
-                    'count': len(df[df['is_bullish_ob'] | df['is_bearish_ob']])
+                    'bullish': public[bullish_ob].to_dict('records'),
+                    'bearish': public[bearish_ob].to_dict('records'),
+                    'count': int(np.count_nonzero(bullish_ob | bearish_ob))
                 },
                 'liquidity_zones': {
-                    'zones': df[df['is_liquidity_zone']].to_dict('records'),
-                    'resistance_levels': df[df['liquidity_type'] == 'resistance']['high_price'].tolist(),
-                    'support_levels': df[df['liquidity_type'] == 'support']['low_price'].tolist(),
-                    'equal_highs': df[df['liquidity_type'] == 'equal_highs']['high_price'].tolist(),
-                    'equal_lows': df[df['liquidity_type'] == 'equal_lows']['low_price'].tolist()
+                    'zones': public[df['is_liquidity_zone'].to_numpy()].to_dict('records'),
+                    'resistance_levels': high[liquidity_type == 'resistance'].tolist(),
+                    'support_levels': low[liquidity_type == 'support'].tolist(),
+                    'equal_highs': high[liquidity_type == 'equal_highs'].tolist(),
+                    'equal_lows': low[liquidity_type == 'equal_lows'].tolist()
                 },
                 'fair_value_gaps': {
-                    'gaps': df[df['is_fvg']].to_dict('records'),
-                    'bullish_gaps': df[df['fvg_type'] == 'bullish'].to_dict('records'),
-                    'bearish_gaps': df[df['fvg_type'] == 'bearish'].to_dict('records')
+                    'gaps': public[df['is_fvg'].to_numpy()].to_dict('records'),
+                    'bullish_gaps': public[fvg_type == 'bullish'].to_dict('records'),
+                    'bearish_gaps': public[fvg_type == 'bearish'].to_dict('records')
                 },
                 'break_of_structure': {
-                    'breaks': df[df['is_bos']].to_dict('records'),
-                    'bullish_breaks': len(df[df['bos_type'] == 'bullish']),
-                    'bearish_breaks': len(df[df['bos_type'] == 'bearish'])
+                    'breaks': public[df['is_bos'].to_numpy()].to_dict('records'),
+                    'bullish_breaks': int(np.count_nonzero(bos_type == 'bullish')),
+                    'bearish_breaks': int(np.count_nonzero(bos_type == 'bearish'))
                 },
                 'advanced_indicators': advanced_analysis
             }
@@ -294,8 +491,9 @@ class ICTSMCAnalyzerService:
             signals = self._generate_trading_signals(ict_analysis, df)
             ict_analysis['trading_signals'] = signals
             
+            self._analysis_cache[key] = (minute, ict_analysis)
             logger.info(f"Comprehensive ICT analysis completed for {symbol}")
-            return ict_analysis
+            return dict(ict_analysis)
             
         except Exception as e:
             logger.error(f"Error in comprehensive ICT analysis for {symbol}: {e}")
@@ -331,11 +529,10 @@ class ICTSMCAnalyzerService:
             # Adjust bias based on ICT concepts
             ict_bias_score = 0
             
-            # Order blocks influence
-            recent_bullish_obs = [ob for ob in analysis['order_blocks']['bullish'] 
-                                if len(analysis['order_blocks']['bullish']) > 0]
-            recent_bearish_obs = [ob for ob in analysis['order_blocks']['bearish'] 
-                                if len(analysis['order_blocks']['bearish']) > 0]
+            # Order blocks influence (most recent five of each side)
+            order_blocks = analysis['order_blocks']
+            recent_bullish_obs = order_blocks['bullish'][-5:]
+            recent_bearish_obs = order_blocks['bearish'][-5:]
             
             if recent_bullish_obs:
                 ict_bias_score += 20
@@ -343,8 +540,9 @@ class ICTSMCAnalyzerService:
                 ict_bias_score -= 20
             
             # Liquidity zones influence
-            resistance_levels = analysis['liquidity_zones']['resistance_levels']
-            support_levels = analysis['liquidity_zones']['support_levels']
+            liquidity_zones = analysis['liquidity_zones']
+            resistance_levels = liquidity_zones['resistance_levels']
+            support_levels = liquidity_zones['support_levels']
             
             # Check if price is near key levels
             for level in resistance_levels[-3:]:  # Last 3 resistance levels
@@ -360,8 +558,8 @@ class ICTSMCAnalyzerService:
                         ict_bias_score += 10  # Bullish near support
             
             # Fair Value Gaps influence
-            unfilled_fvgs = [gap for gap in analysis['fair_value_gaps']['gaps'] 
-                           if gap['fvg_strength'] > 30]  # Strong gaps only
+            gaps = analysis['fair_value_gaps']['gaps']
+            unfilled_fvgs = [gap for gap in gaps if gap['fvg_strength'] > 30]  # Strong gaps only
             
             for gap in unfilled_fvgs[-3:]:  # Recent strong gaps
                 if gap['fvg_type'] == 'bullish' and latest_price > gap['fvg_bottom']:
@@ -370,7 +568,7 @@ class ICTSMCAnalyzerService:
                     ict_bias_score -= 15
             
             # Break of Structure influence
-            recent_bos = analysis['break_of_structure']['breaks'][-5:] if analysis['break_of_structure']['breaks'] else []
+            recent_bos = analysis['break_of_structure']['breaks'][-5:]
             
             for bos in recent_bos:
                 if bos['bos_type'] == 'bullish' and bos['bos_strength'] > 50:
@@ -399,7 +597,7 @@ class ICTSMCAnalyzerService:
             if signals['overall_bias'] in ['bullish', 'strongly_bullish']:
                 # Look for bullish entry opportunities
                 if support_levels:
-                    nearest_support = min(support_levels, key=lambda x: abs(x - latest_price))
+                    nearest_support = support_levels[np.abs(np.asarray(support_levels) - latest_price).argmin()]
                     if latest_price > nearest_support * 1.001:  # Above support
                         signals['entry_signals'].append({
                             'type': 'buy',
@@ -410,12 +608,12 @@ class ICTSMCAnalyzerService:
                 
                 # Target resistance levels
                 if resistance_levels:
-                    signals['key_levels']['targets'] = sorted(resistance_levels)[:3]
+                    signals['key_levels']['targets'] = heapq.nsmallest(3, resistance_levels)
             
             elif signals['overall_bias'] in ['bearish', 'strongly_bearish']:
                 # Look for bearish entry opportunities
                 if resistance_levels:
-                    nearest_resistance = min(resistance_levels, key=lambda x: abs(x - latest_price))
+                    nearest_resistance = resistance_levels[np.abs(np.asarray(resistance_levels) - latest_price).argmin()]
                     if latest_price < nearest_resistance * 0.999:  # Below resistance
                         signals['entry_signals'].append({
                             'type': 'sell',
@@ -426,7 +624,7 @@ class ICTSMCAnalyzerService:
                 
                 # Target support levels
                 if support_levels:
-                    signals['key_levels']['targets'] = sorted(support_levels, reverse=True)[:3]
+                    signals['key_levels']['targets'] = heapq.nlargest(3, support_levels)
             
             # Add risk factors
             if len(unfilled_fvgs) > 3:
@@ -445,33 +643,20 @@ class ICTSMCAnalyzerService:
         
         return signals
 
-    def identify_fair_value_gaps(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Identifies Fair Value Gaps (FVG).
-        FVG: A gap between the high of candle 1 and the low of candle 3.
+    def analyze(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Applies all ICT/SMC analysis methods to the DataFrame.
+        Returns a new frame; the input is not modified, so callers need not copy it.
         """
-        df["is_bullish_fvg"] = False
-        df["is_bearish_fvg"] = False
-
-        if len(df) >= 3:
-            for i in range(len(df) - 2):
-                # Bullish FVG: Low of current candle (i) > High of previous candle (i-1)
-                # And current candle (i) is bullish, next candle (i+1) is bullish
-                if df["low_price"].iloc[i+1] > df["high_price"].iloc[i]:
-                    df.loc[df.index[i+1], "is_bullish_fvg"] = True
-                
-                # Bearish FVG: High of current candle (i) < Low of previous candle (i-1)
-                # And current candle (i) is bearish, next candle (i+1) is bearish
-                if df["high_price"].iloc[i+1] < df["low_price"].iloc[i]:
-                    df.loc[df.index[i+1], "is_bearish_fvg"] = True
+        columns = self._analyze_all(
+            *_float32_columns(df, "open_price", "high_price", "low_price", "close_price", "volume")
+        )
+        df = pd.concat([
+            df.drop(columns=[c for c in columns if c in df.columns]),
+            pd.DataFrame(columns, index=df.index)
+        ], axis=1)
+        df.fillna(0, inplace=True) # Fill any NaNs created by analysis
         return df
 
-    def analyze(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Applies all ICT/SMC analysis methods to the DataFrame."""
-        df = self.identify_order_blocks(df.copy())
-        df = self.identify_liquidity_zones(df.copy())
-        df = self.identify_fair_value_gaps(df.copy())
-        return df.fillna(0) # Fill any NaNs created by analysis
-
 # Example usage (for testing purposes)
 if __name__ == "__main__":
     # Sample data (replace with actual data from your database)
@@ -497,7 +682,7 @@ if __name__ == "__main__":
     df["timestamp"] = pd.to_datetime(df["timestamp"])
 
     analyzer = ICTSMCAnalyzerService()
-    df_analyzed = analyzer.analyze(df.copy())
+    df_analyzed = analyzer.analyze(df)
 
     print("\nData with ICT/SMC Features (first 15 rows):\n", df_analyzed.head(15))
     print("\nColumns in final DataFrame:", df_analyzed.columns.tolist())
@@ -3,10 +3,14 @@ Market Monitor Service for HOT SHARK Bot
 24/7 market monitoring and alert system
 """
 import asyncio
+import heapq
+import itertools
 import logging
+import math
 from datetime import datetime, timedelta
 import pytz
-from typing import List, Dict
+from typing import List, Dict, Optional
+from sqlalchemy import func
 from app.models.database import SessionLocal
 from app.models.user import User
 from app.services.data_collector_service import DataCollectorService
@@ -16,6 +20,30 @@ from app.utils.localization import get_text
 
 logger = logging.getLogger(__name__)
 
+# Market sessions (GMT open time) announced with a market opening alert
+MARKET_OPENINGS = {
+    'sydney': {'open': '21:00', 'name': '🇦🇺 Sydney'},
+    'tokyo': {'open': '23:00', 'name': '🇯🇵 Tokyo'},
+    'london': {'open': '07:00', 'name': '🇬🇧 London'},
+    'new_york': {'open': '12:00', 'name': '🇺🇸 New York'}
+}
+
+# High liquidity periods (GMT start time, duration in hours)
+LIQUIDITY_PERIODS = [
+    {'name': 'London Open', 'time': '07:00', 'duration': 2},
+    {'name': 'London-NY Overlap', 'time': '12:00', 'duration': 4},
+    {'name': 'NY Open', 'time': '12:00', 'duration': 2},
+    {'name': 'Asian Session', 'time': '23:00', 'duration': 3}
+]
+
+# Pairs that receive automatic recommendations
+TRADING_PAIRS = ['XAUUSD', 'BTCUSD', 'ETHUSD', 'EURUSD', 'GBPJPY', 'GBPUSD', 'USDJPY', 'US30', 'US100']
+
+RECOMMENDATION_INTERVAL = timedelta(hours=4)  # Per pair
+RETRY_INTERVAL = 300  # Seconds before re-checking pairs or news alerts that are still due
+NEWS_ALERT_LEAD = timedelta(hours=1)  # Alert for news this far ahead
+EVENT_MAX_DELAY = timedelta(minutes=5)  # Clock alerts later than this are dropped, not sent stale
+
 class MarketMonitorService:
     """24/7 Market monitoring and alert service"""
     
@@ -26,6 +54,14 @@ class MarketMonitorService:
         self.last_liquidity_alert = {}
         self.last_market_opening_alert = {}
         
+        # Heap of (gmt_time, seq, kind, key, name) for the fixed daily alerts
+        self._clock_events = []
+        self._event_seq = itertools.count()
+        
+        # Set by writers to wake the loop before its next deadline
+        self._news_added = asyncio.Event()
+        self._rec_tick = asyncio.Event()
+        
     async def start_monitoring(self):
         """Start 24/7 market monitoring"""
         if self.is_running:
@@ -47,89 +83,107 @@ class MarketMonitorService:
                 pass
         logger.info("Market monitoring stopped")
     
+    def notify_news_added(self):
+        """Wake the monitor to re-check news alerts (call after storing news)"""
+        self._news_added.set()
+    
+    def notify_recommendation_tick(self):
+        """Wake the monitor to re-check automatic recommendations"""
+        self._rec_tick.set()
+    
     async def _monitoring_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop.
+        Sleeps until the next market opening / liquidity period, recommendation or news
+        deadline, or until a writer signals new work, instead of polling.
+        """
+        loop = asyncio.get_running_loop()
+        self._schedule_clock_events(datetime.now(pytz.UTC) - EVENT_MAX_DELAY)
+        next_recommendation = next_news = loop.time()  # Check both straight away
+        
         while self.is_running:
             try:
-                # Check market openings
-                await self._check_market_openings()
-                
-                # Check high liquidity periods
-                await self._check_high_liquidity()
+                # Fire market openings and high liquidity periods that are due
+                await self._fire_due_clock_events()
                 
                 # Generate automatic recommendations
-                await self._generate_auto_recommendations()
+                if self._rec_tick.is_set() or loop.time() >= next_recommendation:
+                    self._rec_tick.clear()
+                    await self._generate_auto_recommendations()
+                    next_recommendation = loop.time() + self._seconds_until_next_recommendation()
                 
                 # Check for important news alerts
-                await self._check_news_alerts()
+                if self._news_added.is_set() or loop.time() >= next_news:
+                    self._news_added.clear()
+                    await self._check_news_alerts()
+                    delay = self._seconds_until_next_news_alert()
+                    next_news = loop.time() + delay if delay is not None else math.inf
                 
-                # Wait 5 minutes before next check
-                await asyncio.sleep(300)  # 5 minutes
+                # Sleep until the soonest deadline
+                timeout = min(next_recommendation, next_news) - loop.time()
+                if self._clock_events:
+                    clock_delay = (self._clock_events[0][0] - datetime.now(pytz.UTC)).total_seconds()
+                    timeout = min(timeout, clock_delay)
+                await self._wait_for_wakeup(timeout)
                 
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
                 await asyncio.sleep(60)  # Wait 1 minute on error
     
-    async def _check_market_openings(self):
-        """Check for market opening times and send alerts"""
-        now_gmt = datetime.now(pytz.UTC)
+    async def _wait_for_wakeup(self, timeout: float):
+        """Wait up to timeout seconds, returning early when a writer sets one of the events"""
+        waiters = [asyncio.ensure_future(event.wait()) for event in (self._news_added, self._rec_tick)]
+        try:
+            await asyncio.wait(waiters, timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+    
+    def _schedule_clock_events(self, after: datetime):
+        """Queue the next occurrence at or after `after` of every daily GMT alert"""
+        self._clock_events = []
         
-        # Market sessions to check
-        markets = {
-            'sydney': {'open': '21:00', 'name': '🇦🇺 Sydney'},
-            'tokyo': {'open': '23:00', 'name': '🇯🇵 Tokyo'},
-            'london': {'open': '07:00', 'name': '🇬🇧 London'},
-            'new_york': {'open': '12:00', 'name': '🇺🇸 New York'}
-        }
+        events = [('market_opening', market_id, info['open'], info['name'])
+                  for market_id, info in MARKET_OPENINGS.items()]
+        events += [('liquidity', period['name'], period['time'], period['name'])
+                   for period in LIQUIDITY_PERIODS]
         
-        for market_id, market_info in markets.items():
-            # Check if it's market opening time (within 1 minute)
-            open_time = datetime.strptime(market_info['open'], '%H:%M').time()
-            market_open_datetime = datetime.combine(now_gmt.date(), open_time)
-            market_open_datetime = pytz.UTC.localize(market_open_datetime)
-            
-            time_diff = abs((now_gmt - market_open_datetime).total_seconds())
-            
-            # If within 1 minute of opening and haven't alerted today
-            if time_diff <= 60:
-                today_key = f"{market_id}_{now_gmt.date()}"
-                if today_key not in self.last_market_opening_alert:
-                    await self._send_market_opening_alert(market_info['name'])
-                    self.last_market_opening_alert[today_key] = now_gmt
+        for kind, key, start, name in events:
+            start_time = datetime.strptime(start, '%H:%M').time()
+            when = pytz.UTC.localize(datetime.combine(after.date(), start_time))
+            if when < after:
+                when += timedelta(days=1)
+            heapq.heappush(self._clock_events, (when, next(self._event_seq), kind, key, name))
     
-    async def _check_high_liquidity(self):
-        """Check for high liquidity periods and send alerts"""
+    async def _fire_due_clock_events(self):
+        """Send every clock alert whose time has come and re-queue it for the next day"""
         now_gmt = datetime.now(pytz.UTC)
         
-        # High liquidity periods
-        liquidity_periods = [
-            {'name': 'London Open', 'time': '07:00', 'duration': 2},
-            {'name': 'London-NY Overlap', 'time': '12:00', 'duration': 4},
-            {'name': 'NY Open', 'time': '12:00', 'duration': 2},
-            {'name': 'Asian Session', 'time': '23:00', 'duration': 3}
-        ]
-        
-        for period in liquidity_periods:
-            start_time = datetime.strptime(period['time'], '%H:%M').time()
-            start_datetime = datetime.combine(now_gmt.date(), start_time)
-            start_datetime = pytz.UTC.localize(start_datetime)
+        while self._clock_events and self._clock_events[0][0] <= now_gmt:
+            when, _, kind, key, name = heapq.heappop(self._clock_events)
+            
+            # Next occurrence; skips whole days if the process was suspended
+            next_when = when + timedelta(days=1)
+            while next_when <= now_gmt:
+                next_when += timedelta(days=1)
+            heapq.heappush(self._clock_events, (next_when, next(self._event_seq), kind, key, name))
             
-            time_diff = abs((now_gmt - start_datetime).total_seconds())
+            if now_gmt - when > EVENT_MAX_DELAY:
+                logger.warning(f"Skipping stale {kind} alert for {name} scheduled at {when}")
+                continue
             
-            # If within 1 minute of high liquidity period start
-            if time_diff <= 60:
-                today_key = f"{period['name']}_{now_gmt.date()}"
-                if today_key not in self.last_liquidity_alert:
-                    await self._send_liquidity_alert(period['name'])
-                    self.last_liquidity_alert[today_key] = now_gmt
+            today_key = f"{key}_{when.date()}"
+            if kind == 'market_opening':
+                if today_key not in self.last_market_opening_alert:
+                    await self._send_market_opening_alert(name)
+                    self.last_market_opening_alert[today_key] = now_gmt
+            elif today_key not in self.last_liquidity_alert:
+                await self._send_liquidity_alert(name)
+                self.last_liquidity_alert[today_key] = now_gmt
     
     async def _generate_auto_recommendations(self):
         """Generate automatic recommendations based on market analysis"""
         try:
-            # Get supported trading pairs
-            trading_pairs = ['XAUUSD', 'BTCUSD', 'ETHUSD', 'EURUSD', 'GBPJPY', 'GBPUSD', 'USDJPY', 'US30', 'US100']
-            
-            for pair in trading_pairs:
+            for pair in TRADING_PAIRS:
                 # Check if we should generate a recommendation for this pair
                 if await self._should_generate_recommendation(pair):
                     recommendation = await AutoRecommendationService.generate_recommendation(pair)
@@ -146,7 +200,7 @@ class MarketMonitorService:
         db = SessionLocal()
         try:
             now = datetime.now()
-            one_hour_later = now + timedelta(hours=1)
+            one_hour_later = now + NEWS_ALERT_LEAD
             
             # Get news in the next hour that haven't been alerted
             upcoming_news = db.query(News).filter(
@@ -176,18 +230,62 @@ class MarketMonitorService:
             # Check last recommendation time for this pair
             last_rec = db.query(Recommendation).filter(
                 Recommendation.asset_pair == pair
-            ).order_by(Recommendation.created_at.desc()).first()
+            ).order_by(Recommendation.sent_at.desc()).first()
             
             if not last_rec:
                 return True  # No previous recommendation
             
             # Check if 4 hours have passed
-            time_diff = datetime.now() - last_rec.created_at
-            return time_diff.total_seconds() > 14400  # 4 hours
+            time_diff = datetime.now() - last_rec.sent_at
+            return time_diff > RECOMMENDATION_INTERVAL
             
         finally:
             db.close()
     
+    def _seconds_until_next_recommendation(self) -> float:
+        """Seconds until the next pair becomes due for a recommendation"""
+        from app.models.recommendation import Recommendation
+        
+        db = SessionLocal()
+        try:
+            last_sent = dict(db.query(
+                Recommendation.asset_pair, func.max(Recommendation.sent_at)
+            ).filter(
+                Recommendation.asset_pair.in_(TRADING_PAIRS)
+            ).group_by(Recommendation.asset_pair).all())
+        finally:
+            db.close()
+        
+        # A pair without any recommendation is still due (generation returned nothing)
+        if len(last_sent) < len(TRADING_PAIRS):
+            return RETRY_INTERVAL
+        
+        now = datetime.now()
+        due = min(sent + RECOMMENDATION_INTERVAL for sent in last_sent.values())
+        return max((due - now).total_seconds(), RETRY_INTERVAL)
+    
+    def _seconds_until_next_news_alert(self) -> Optional[float]:
+        """Seconds until the next unalerted important news enters the alert window (None if none).
+        News already inside the window that is still unalerted is retried after RETRY_INTERVAL.
+        """
+        from app.models.news import News
+        
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            next_time = db.query(func.min(News.time)).filter(
+                News.time >= now,
+                News.impact.in_(['high', 'critical']),
+                News.alerted == False
+            ).scalar()
+        finally:
+            db.close()
+        
+        if next_time is None:
+            return None
+        delay = (next_time - NEWS_ALERT_LEAD - now).total_seconds()
+        return delay if delay > 0 else RETRY_INTERVAL
+    
     async def _send_market_opening_alert(self, market_name: str):
         """Send market opening alert to all subscribed users"""
         db = SessionLocal()
@@ -174,6 +174,14 @@ class MockExnessDataService:
             logger.error(f"Error generating mock OHLCV data for {symbol}: {e}")
             return []
     
+    async def get_ohlcv_columns(self, symbol: str, timeframe: str = "M1", count: int = 1000) -> Dict[str, Any]:
+        """Generate mock OHLCV data as column arrays"""
+        ohlcv_data = await self.get_ohlcv_data(symbol, timeframe, count)
+        if not ohlcv_data:
+            return {}
+        df = pd.DataFrame(ohlcv_data)
+        return {col: df[col].to_numpy() for col in ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'spread')}
+    
     async def get_symbol_info(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Generate mock symbol information"""
         try:
@@ -221,38 +229,31 @@ class MockExnessDataService:
                 logger.warning(f"No mock data to store for {symbol}")
                 return
             
-            # Convert to MarketData objects
-            data_to_store = []
+            # Build insert mappings directly, deduplicated on (symbol, timestamp)
+            existing_timestamps = set()
+            unique_data = []
+            
             for data_point in ohlcv_data:
-                market_data = MarketData(
-                    symbol=symbol,
-                    timestamp=data_point['timestamp'],
-                    open_price=data_point['open'],
-                    high_price=data_point['high'],
-                    low_price=data_point['low'],
-                    close_price=data_point['close'],
-                    volume=data_point['volume'],
-                    interval=timeframe,
-                    source="MockExness"
-                )
-                data_to_store.append(market_data)
-            
-            # Store in database
-            if data_to_store:
-                # Remove duplicates based on symbol and timestamp
-                existing_timestamps = set()
-                unique_data = []
-                
-                for data in data_to_store:
-                    timestamp_key = f"{data.symbol}_{data.timestamp}"
-                    if timestamp_key not in existing_timestamps:
-                        existing_timestamps.add(timestamp_key)
-                        unique_data.append(data)
-                
-                self.db.add_all(unique_data)
-                self.db.commit()
-                
-                logger.info(f"Successfully stored {len(unique_data)} mock data points for {symbol}")
+                timestamp_key = (symbol, data_point['timestamp'])
+                if timestamp_key not in existing_timestamps:
+                    existing_timestamps.add(timestamp_key)
+                    unique_data.append({
+                        'symbol': symbol,
+                        'timestamp': data_point['timestamp'],
+                        'open_price': data_point['open'],
+                        'high_price': data_point['high'],
+                        'low_price': data_point['low'],
+                        'close_price': data_point['close'],
+                        'volume': data_point['volume'],
+                        'interval': timeframe,
+                        'source': "MockExness"
+                    })
+            
+            # Store in database, skipping the ORM unit of work
+            self.db.bulk_insert_mappings(MarketData, unique_data)
+            self.db.commit()
+            
+            logger.info(f"Successfully stored {len(unique_data)} mock data points for {symbol}")
             
         except Exception as e:
             logger.error(f"Error collecting and storing mock data for {symbol}: {e}")
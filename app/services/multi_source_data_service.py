@@ -47,7 +47,7 @@ class MultiSourceDataService:
         self.current_source = 'free_market_data'
         self.fallback_count = 0
         
-    def get_current_price(self, symbol: str) -> Optional[Dict]:
+    async def get_current_price(self, symbol: str) -> Optional[Dict]:
         """Get current price with automatic fallback"""
         for source_name, service in self.source_priority:
             try:
@@ -56,7 +56,7 @@ class MultiSourceDataService:
                 if source_name == 'yahoo_finance':
                     price_data = service.get_current_price(symbol)
                 elif source_name == 'alpha_vantage':
-                    price_data = service.get_current_price(symbol)
+                    price_data = await service.get_current_price(symbol)
                 else:  # mock_exness
                     price_data = service.get_current_price(symbol)
                 
@@ -93,7 +93,7 @@ class MultiSourceDataService:
         logger.error(f"All sources failed for intraday data: {symbol}")
         return None
     
-    def get_multiple_prices(self, symbols: List[str]) -> Dict[str, Dict]:
+    async def get_multiple_prices(self, symbols: List[str]) -> Dict[str, Dict]:
         """Get multiple prices efficiently"""
         try:
             # Try Yahoo Finance first (supports batch requests)
@@ -107,7 +107,7 @@ class MultiSourceDataService:
             # Fallback to individual requests
             results = {}
             for symbol in symbols:
-                price_data = self.get_current_price(symbol)
+                price_data = await self.get_current_price(symbol)
                 if price_data:
                     results[symbol] = price_data
             
@@ -117,7 +117,7 @@ class MultiSourceDataService:
             logger.error(f"Error getting multiple prices: {e}")
             return {}
     
-    def get_data_with_volume_analysis(self, symbol: str, interval: str = '5min') -> Optional[Dict]:
+    async def get_data_with_volume_analysis(self, symbol: str, interval: str = '5min') -> Optional[Dict]:
         """Get enhanced data with volume analysis"""
         try:
             # Get intraday data
@@ -139,7 +139,7 @@ class MultiSourceDataService:
             volume_dots = df[df['volume'] > volume_threshold][['timestamp', 'close', 'volume']].to_dict('records')
             
             # Get current price
-            current_price_data = self.get_current_price(symbol)
+            current_price_data = await self.get_current_price(symbol)
             current_price = current_price_data['price'] if current_price_data else df['close'].iloc[-1]
             
             return {
@@ -157,13 +157,15 @@ class MultiSourceDataService:
             logger.error(f"Error getting enhanced data for {symbol}: {e}")
             return None
     
-    def test_connection(self) -> Dict[str, bool]:
+    async def test_connection(self) -> Dict[str, bool]:
         """Test connection to all sources"""
         results = {}
         
         for source_name, service in self.source_priority:
             try:
-                if hasattr(service, 'test_connection'):
+                if source_name == 'alpha_vantage':
+                    results[source_name] = await service.test_connection()
+                elif hasattr(service, 'test_connection'):
                     results[source_name] = service.test_connection()
                 else:
                     # Try a simple operation
@@ -167,7 +167,7 @@ class TwelveDataService:
             df_data = []
             for item in values:
                 df_data.append({
-                    'timestamp': datetime.strptime(item['datetime'], '%Y-%m-%d %H:%M:%S'),
+                    'timestamp': datetime.fromisoformat(item['datetime']),  # Fixed 'YYYY-MM-DD HH:MM:SS' format
                     'open': float(item['open']),
                     'high': float(item['high']),
                     'low': float(item['low']),
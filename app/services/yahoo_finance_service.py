@@ -15,7 +15,7 @@ import requests
 from bs4 import BeautifulSoup
 
 from app.config import Config
-from app.models.market_data import MarketData
+from app.models.market_data import MarketData, insert_market_data
 
 logger = logging.getLogger(__name__)
 
@@ -277,31 +277,27 @@ class YahooFinanceService:
     def save_to_database(self, symbol: str, df: pd.DataFrame, timeframe: str):
         """Save market data to database"""
         try:
-            for _, row in df.iterrows():
-                market_data = MarketData(
-                    symbol=symbol,
-                    timeframe=timeframe,
-                    timestamp=row['timestamp'],
-                    open_price=row['open'],
-                    high_price=row['high'],
-                    low_price=row['low'],
-                    close_price=row['close'],
-                    volume=row['volume'],
-                    source='Yahoo Finance'
-                )
-                
-                # Check if data already exists
-                existing = self.db.query(MarketData).filter(
+            # Fetch the timestamps already stored in one query instead of one per row
+            existing = {
+                r[0] for r in self.db.query(MarketData.timestamp).filter(
                     MarketData.symbol == symbol,
-                    MarketData.timeframe == timeframe,
-                    MarketData.timestamp == row['timestamp']
-                ).first()
-                
-                if not existing:
-                    self.db.add(market_data)
+                    MarketData.interval == timeframe,
+                    MarketData.timestamp.in_(df['timestamp'].tolist())
+                ).all()
+            }
+            new_df = df[~df['timestamp'].isin(existing)]
+            
+            records = new_df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].rename(columns={
+                'open': 'open_price',
+                'high': 'high_price',
+                'low': 'low_price',
+                'close': 'close_price'
+            }).assign(symbol=symbol, interval=timeframe, source='Yahoo Finance').to_dict('records')
             
+            # ON CONFLICT DO NOTHING covers bars a concurrent writer stored after the prefetch
+            insert_market_data(self.db, records)
             self.db.commit()
-            logger.info(f"Saved {len(df)} data points for {symbol} to database")
+            logger.info(f"Saved {len(records)} new data points for {symbol} to database")
             
         except Exception as e:
             logger.error(f"Error saving data to database: {e}")
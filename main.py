@@ -11,7 +11,9 @@ from fastapi.templating import Jinja2Templates
 from telegram import Update
 from app.bot import bot
 from app.services.data_collector_service import DataCollectorService
+from app.services.alpha_vantage_service import AlphaVantageService
 from app.models.database import Base, engine, SessionLocal
+from app.models.market_data import ensure_market_data_schema
 from app.services.scheduler_service import SchedulerService
 from app.services.training_service import TrainingService
 from app.services.auto_recommendation_service import AutoRecommendationService
@@ -102,6 +104,7 @@ async def startup_event():
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    ensure_market_data_schema(engine)
     
     # Setup webhook
     await bot.setup_webhook()
@@ -154,6 +157,9 @@ async def shutdown_event():
     if scheduler_service:
         scheduler_service.stop()
     
+    await AlphaVantageService.close()
+    await DataCollectorService.aclose()
+    
     logger.info("Bot shutdown complete!")
 
 @app.get("/")
@@ -226,13 +232,18 @@ async def bot_status():
     }
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
     
     port = int(os.environ.get("PORT", 8000))
     
+    # libuv event loop for the monitor / Telegram send fan-outs; uvloop is not available on Windows
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "auto"
+    
     uvicorn.run(
         app, 
         host="0.0.0.0", 
         port=port,
+        loop=loop,
         log_level="info"
         )
@@ -2,6 +2,7 @@
 """
 Production server runner for HOT SHARK Bot
 """
+import importlib.util
 import uvicorn
 from main import app
 
@@ -18,6 +19,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=False,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "auto",
         log_level="info"
     )
 
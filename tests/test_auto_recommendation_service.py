@@ -0,0 +1,58 @@
+"""
+Tests for persisting auto-generated recommendations.
+"""
+import json
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.database import Base
+from app.models.recommendation import Recommendation
+# Register every model so the relationship() targets resolve
+from app.models import news, report, setting, subscription, user, user_trade  # noqa: F401
+from app.services.auto_recommendation_service import AutoRecommendationService
+
+
+def test_build_recommendation_maps_generated_fields_to_columns():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    service = AutoRecommendationService(db, MagicMock())
+    recommendation_data = {
+        'symbol': 'EURUSD',
+        'signal_type': 'BUY',
+        'entry_price': 1.1,
+        'tp_levels': [1.111, 1.122],
+        'sl_price': 1.0945,
+        'success_probability': 0.9,
+        'trade_type': service.determine_trade_type("1min", 2),
+        'strategy': "ICT/SMC + AI Analysis",
+        'lot_size': 0.01,
+        'is_premium': True,
+        'analysis_data': {}
+    }
+    context = service.build_message_context(recommendation_data)
+    message = service.format_recommendation_message(recommendation_data, "ar", context)
+
+    recommendation = service.build_recommendation(recommendation_data, context, message)
+    db.add(recommendation)
+    db.commit()
+
+    stored = db.query(Recommendation).one()
+    assert stored.asset_pair == 'EURUSD'
+    assert stored.trade_type == 'BUY'
+    assert json.loads(stored.entry_points) == [1.1]
+    assert json.loads(stored.tp) == [1.111, 1.122]
+    assert stored.sl == '1.0945'
+    assert stored.pips == context['tp1_pips']
+    assert stored.success_rate == 90.0
+    assert stored.trade_duration == recommendation_data['trade_type']
+    assert stored.rr_ratio == f"1:{context['rr_ratio']}"
+    assert stored.lot_size_per_100 == 0.01
+    assert stored.message_text == message
+    assert stored.is_premium is True
+    assert stored.is_live is True
+    assert stored.status == "active"
+    db.close()
@@ -0,0 +1,84 @@
+"""
+Regression tests for the ICT/SMC analyzer.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.ict_smc_analyzer_service import ICTSMCAnalyzerService
+
+
+def _reference_liquidity_zones(df: pd.DataFrame, range_percent: float = 0.001, window: int = 5):
+    """Plain-loop liquidity zones using the float tolerance band for equal highs/lows,
+    as implemented before the tick-grid pre-filter."""
+    high = df["high_price"].to_numpy(dtype=np.float32)
+    low = df["low_price"].to_numpy(dtype=np.float32)
+    volume = df["volume"].to_numpy(dtype=np.float32)
+    swing_high = pd.Series(high).rolling(window=window, center=True).max().to_numpy()
+    swing_low = pd.Series(low).rolling(window=window, center=True).min().to_numpy()
+
+    n = len(df)
+    is_zone = np.zeros(n, dtype=bool)
+    liquidity_type = np.full(n, "", dtype=object)
+    strength = np.zeros(n, dtype=np.float64)
+
+    for i in range(window, n - window):
+        current_high = high[i]
+        current_low = low[i]
+        current_volume = volume[i]
+        avg_volume = np.nanmean(volume[i - window:i + window])
+
+        if current_high == swing_high[i] and current_volume > avg_volume * 1.5:
+            is_zone[i] = True
+            liquidity_type[i] = "resistance"
+            strength[i] = min(100.0, (current_volume / avg_volume) * 20)
+
+        if current_low == swing_low[i] and current_volume > avg_volume * 1.5:
+            is_zone[i] = True
+            liquidity_type[i] = "support"
+            strength[i] = min(100.0, (current_volume / avg_volume) * 20)
+
+        # Band in float64, as numba promotes it; NEP 50 would otherwise round it to float32
+        band_high = float(current_high)
+        band_low = float(current_low)
+        tolerance = band_high * range_percent
+        recent_high = high[max(0, i - 20):i].astype(np.float64)
+        recent_low = low[max(0, i - 20):i].astype(np.float64)
+        equal_highs = np.sum((recent_high >= band_high - tolerance) & (recent_high <= band_high + tolerance))
+        equal_lows = np.sum((recent_low >= band_low - tolerance) & (recent_low <= band_low + tolerance))
+
+        if equal_highs >= 2:
+            is_zone[i] = True
+            liquidity_type[i] = "equal_highs"
+            strength[i] = min(100.0, equal_highs * 25.0)
+
+        if equal_lows >= 2:
+            is_zone[i] = True
+            liquidity_type[i] = "equal_lows"
+            strength[i] = min(100.0, equal_lows * 25.0)
+
+    return is_zone, liquidity_type, strength
+
+
+@pytest.mark.parametrize("volatility", [0.0005, 0.004])
+def test_liquidity_zones_match_float_tolerance_band(volatility):
+    analyzer = ICTSMCAnalyzerService()
+
+    for seed in range(50):
+        rng = np.random.default_rng(seed)
+        n = 60
+        close = 1.1 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+        df = pd.DataFrame({
+            "open_price": close,
+            "high_price": close * (1 + rng.random(n) * volatility),
+            "low_price": close * (1 - rng.random(n) * volatility),
+            "close_price": close,
+            "volume": rng.integers(1, 100, n).astype(float)
+        })
+
+        result = analyzer.identify_liquidity_zones(df.copy())
+        is_zone, liquidity_type, strength = _reference_liquidity_zones(df)
+
+        np.testing.assert_array_equal(result["is_liquidity_zone"].to_numpy(), is_zone)
+        np.testing.assert_array_equal(result["liquidity_type"].astype(str).to_numpy(), liquidity_type.astype(str))
+        np.testing.assert_allclose(result["liquidity_strength"].to_numpy(), strength, rtol=1e-5)